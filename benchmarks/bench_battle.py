@@ -0,0 +1,49 @@
+import random
+import time
+from game import EnemyStore, GameWorld, Player
+
+# GameWorld.battle throughput, and the same fights through iter_battle with
+# no message formatting. Run from the repository root:
+# python -m benchmarks.bench_battle
+
+ENEMIES = (("Goblin", 30, 5, 5), ("Dragon", 100, 15, 20))
+
+
+def fight_many(battles, enemy, seed, formatted):
+    player = Player("Bench")
+    world = GameWorld(player, random.Random(seed))
+    world.enemies = EnemyStore()
+    start = time.perf_counter()
+    for _ in range(battles):
+        # every fight starts from the same stats
+        player.health, player.attack_power, player.level, player.experience = 100, 10, 1, 0
+        world.current_enemy = world.enemies.add(*enemy)
+        if formatted:
+            world.battle()
+        else:
+            for _event in world.iter_battle():
+                pass
+        if world.current_enemy.is_alive():
+            world.enemies.remove(world.current_enemy)
+    return time.perf_counter() - start
+
+
+def run(battles=20_000, seed=0):
+    results = []
+    for enemy in ENEMIES:
+        for mode, formatted in (("battle", True), ("iter_battle", False)):
+            elapsed = fight_many(battles, enemy, seed, formatted)
+            results.append({
+                "enemy": enemy[0],
+                "mode": mode,
+                "battles": battles,
+                "battles_per_s": battles / elapsed,
+                "battle_us": elapsed / battles * 1e6,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'enemy':>8}  {'mode':>12}  {'battles/s':>12}  {'us/battle':>10}")
+    for result in run():
+        print(f"{result['enemy']:>8}  {result['mode']:>12}  {result['battles_per_s']:>12,.0f}  {result['battle_us']:>10.2f}")
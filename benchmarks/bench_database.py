@@ -0,0 +1,124 @@
+import os
+import random
+import tempfile
+import time
+from game import LEADERBOARDS, GameDatabase, Item, Player, Quest
+
+# save_player, load_player, autosave batches and leaderboard pages against
+# databases of 10^3 to 10^6 players, each with a few inventory stacks and
+# quests. The database grows from one size to the next, so each size only pays
+# for its new rows.
+# Run from the repository root: python -m benchmarks.bench_database
+
+STACKS = (("Health Potion", "heal"), ("Strength Elixir", "boost"), ("Mystery Box", "random"))
+
+
+def populate(db, start, stop):
+    with db.conn:
+        first_id = db.conn.execute("SELECT COALESCE(MAX(id), 0) FROM players").fetchone()[0]
+        db.conn.executemany(
+            "INSERT INTO players (name, health, attack_power, level, experience, quests_completed) VALUES (?, 100, 10, ?, ?, ?)",
+            ((f"player-{index}", index % 50 + 1, index * 7919 % 1000, index % 13) for index in range(start, stop)),
+        )
+        for name, effect in STACKS:
+            db.conn.execute(
+                "INSERT INTO inventory (player_id, item_name, quantity, effect) SELECT id, ?, 2, ? FROM players WHERE id > ?",
+                (name, effect, first_id),
+            )
+        db.conn.execute(
+            "INSERT INTO quests (player_id, position, description, is_completed, progress) "
+            "SELECT id, 0, 'Defeat 5 Goblins', 0, 1 FROM players WHERE id > ?",
+            (first_id,),
+        )
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+
+
+def timed(func, args):
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def run(sizes=(10**3, 10**4, 10**5), seed=0, samples=200, batch=100):
+    results = []
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        db = GameDatabase(path)
+        populated = 0
+        for size in sizes:
+            build_start = time.perf_counter()
+            populate(db, populated, size)
+            build_s = time.perf_counter() - build_start
+            populated = size
+            names = [f"player-{rng.randrange(size)}" for _ in range(samples)]
+
+            def load(name):
+                db.cache.clear()
+                db.load_player(name)
+
+            def save(name):
+                player = Player(name)
+                player.add_item(Item("Health Potion", "heal", 3))
+                player.accept_quest(Quest("Defeat 5 Goblins"))
+                db.save_player(player)
+
+            def apply_batch(offset):
+                players = [Player(f"player-{rng.randrange(size)}") for _ in range(batch)]
+                for player in players:
+                    player.health -= offset % 7 + 1
+                    player.add_item(Item("Magic Stone", "boost"))
+                db.apply_changes([player.collect_changes() for player in players])
+
+            def first_page(board):
+                db.leaderboard(board)
+
+            def deep_page(name):
+                # a page starting right after an arbitrary player, as a cursor
+                # from deep in the board would
+                row = db.conn.execute(
+                    "SELECT r.level, r.experience, r.player_id FROM players AS p "
+                    "JOIN player_rankings AS r ON r.player_id = p.id WHERE p.name = ?",
+                    (name,),
+                ).fetchone()
+                start = time.perf_counter()
+                db.leaderboard("level", after=(0, *row))
+                return time.perf_counter() - start
+
+            load_p50, load_p99 = timed(load, names)
+            save_p50, save_p99 = timed(save, names)
+            batch_p50, batch_p99 = timed(apply_batch, range(20))
+            first_p50, first_p99 = timed(first_page, [board for board in LEADERBOARDS for _ in range(samples // len(LEADERBOARDS))])
+            deep_p50, deep_p99 = percentiles([deep_page(name) for name in names])
+            results.append({
+                "players": size,
+                "build_s": build_s,
+                "load_p50_ms": load_p50,
+                "load_p99_ms": load_p99,
+                "save_p50_ms": save_p50,
+                "save_p99_ms": save_p99,
+                "autosave_batch": batch,
+                "autosave_p50_ms": batch_p50,
+                "autosave_p99_ms": batch_p99,
+                "leaderboard_p50_ms": first_p50,
+                "leaderboard_p99_ms": first_p99,
+                "deep_page_p50_ms": deep_p50,
+                "deep_page_p99_ms": deep_p99,
+            })
+        db.conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    columns = ["players", "load_p50_ms", "load_p99_ms", "save_p50_ms", "save_p99_ms", "autosave_p50_ms", "autosave_p99_ms",
+               "leaderboard_p50_ms", "deep_page_p50_ms"]
+    print("  ".join(f"{column:>15}" for column in columns))
+    for result in run():
+        print("  ".join(f"{result[column]:>15.3f}" if isinstance(result[column], float) else f"{result[column]:>15}" for column in columns))
@@ -0,0 +1,62 @@
+import random
+import time
+import numpy as np
+from game import Player, Enemy, EnemyStore, GameWorld
+
+# Per-encounter cost of GameWorld.encounter_enemy against the old approach of
+# filtering a list of Enemy objects and calling random.choice on the result.
+# Run from the repository root: python -m benchmarks.bench_encounter
+
+
+def list_encounter(enemies, player, rng):
+    possible_enemies = [e for e in enemies if e.health <= (player.level * 20)]
+    if not possible_enemies:
+        possible_enemies = enemies
+    return rng.choice(possible_enemies)
+
+
+def make_population(count, seed=0):
+    rng = np.random.default_rng(seed)
+    health = rng.integers(10, 400, count)
+    attack_power = rng.integers(1, 20, count)
+    experience = rng.integers(1, 20, count)
+    names = ["Goblin", "Orc", "Dragon", "Troll"]
+    return [names[i % len(names)] for i in range(count)], health, attack_power, experience
+
+
+def per_call_us(func, budget=0.5):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / calls * 1e6
+
+
+def run(sizes=(10**3, 10**4, 10**5, 10**6), seed=0):
+    results = []
+    for size in sizes:
+        names, health, attack_power, experience = make_population(size, seed)
+        player = Player("Bench")
+        player.level = 5
+
+        enemies = [Enemy(*row) for row in zip(names, health.tolist(), attack_power.tolist(), experience.tolist())]
+        rng = random.Random(seed)
+        list_us = per_call_us(lambda: list_encounter(enemies, player, rng))
+
+        world = GameWorld(player, seed)
+        world.enemies = EnemyStore()
+        world.enemies.extend(names, health, attack_power, experience)
+        indexed_us = per_call_us(world.encounter_enemy)
+
+        results.append({"enemies": size, "list_us": list_us, "indexed_us": indexed_us})
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'enemies':>10}  {'list (us)':>12}  {'indexed (us)':>12}  {'speedup':>8}")
+    for result in run():
+        speedup = result["list_us"] / result["indexed_us"]
+        print(f"{result['enemies']:>10}  {result['list_us']:>12.2f}  {result['indexed_us']:>12.2f}  {speedup:>7.0f}x")
@@ -0,0 +1,35 @@
+import random
+import time
+from game import ITEM_ROSTER, Item, Player
+
+# Player.use_item against inventories of many distinct stacks.
+# Run from the repository root: python -m benchmarks.bench_inventory
+
+
+def make_player(stacks):
+    player = Player("Bench")
+    for index in range(stacks):
+        # deep stacks, so no use empties one and the inventory size holds
+        player.add_item(Item(f"Item {index}", ITEM_ROSTER[index % len(ITEM_ROSTER)][1], 1_000_000))
+    player.clear_changes()
+    return player
+
+
+def run(sizes=(10, 10**3, 10**5), seed=0, uses=20_000):
+    results = []
+    for size in sizes:
+        player = make_player(size)
+        rng = random.Random(seed)
+        names = [f"Item {rng.randrange(size)}" for _ in range(uses)]
+        start = time.perf_counter()
+        for name in names:
+            player.use_item(name, rng)
+        elapsed = time.perf_counter() - start
+        results.append({"stacks": size, "uses": uses, "use_item_us": elapsed / uses * 1e6})
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'stacks':>10}  {'use_item (us)':>14}")
+    for result in run():
+        print(f"{result['stacks']:>10}  {result['use_item_us']:>14.2f}")
@@ -0,0 +1,46 @@
+import os
+import time
+
+# PygameApp frame time with SDL's dummy video driver, so it runs without a
+# display. Every few frames a key press forces an attack and a message redraw.
+# Run from the repository root: python -m benchmarks.bench_render
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from game import Enemy, Player
+from main import PygameApp, Renderer
+
+
+def run(frames=2000, press_every=10, seed=0):
+    import pygame
+    renderer = Renderer()
+    try:
+        player = Player("Bench")
+        app = PygameApp(player, renderer)
+        # enough health that the fight outlasts the run
+        app.start_battle(Enemy("Dragon", 10**9, 15, 20))
+        samples = []
+        for frame in range(frames):
+            if frame % press_every == 0:
+                key = pygame.K_1 if (frame // press_every + seed) % 2 else pygame.K_2
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+            start = time.perf_counter()
+            app.frame()
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        return [{
+            "frames": frames,
+            "frame_mean_ms": sum(samples) / frames * 1000,
+            "frame_p50_ms": samples[frames // 2] * 1000,
+            "frame_p99_ms": samples[min(frames - 1, int(frames * 0.99))] * 1000,
+            "text_cache_size": len(renderer.text_cache),
+        }]
+    finally:
+        renderer.close()
+
+
+if __name__ == "__main__":
+    for result in run():
+        print(f"{result['frames']} frames: mean {result['frame_mean_ms']:.3f} ms, "
+              f"p50 {result['frame_p50_ms']:.3f} ms, p99 {result['frame_p99_ms']:.3f} ms")
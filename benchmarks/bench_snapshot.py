@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+from game import Player, Item, Quest, GameDatabase, GameWorld
+from snapshot import Snapshot, write_snapshot, load_snapshot
+
+# Compares quick-save/quick-load through snapshots with GameDatabase.
+# Run from the repository root: python -m benchmarks.bench_snapshot
+
+
+def make_world(items, quests):
+    player = Player("Bench")
+    for index in range(items):
+        player.add_item(Item(f"Item {index}", "heal", index % 5 + 1))
+    for index in range(quests):
+        quest = Quest(f"Quest {index}")
+        player.accept_quest(quest)
+        quest.is_completed = index % 2 == 0
+    return GameWorld(player, 0)
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes=(10, 1000, 10000), repeat=5):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "world.snap")
+        db = GameDatabase(os.path.join(directory, "bench.db"))
+        for size in sizes:
+            world = make_world(size, size)
+
+            def db_load():
+                db.cache.clear()
+                db.load_player("Bench")
+
+            def stats_only():
+                with Snapshot(snapshot_path) as snapshot:
+                    snapshot.player_stats()
+
+            results.append({
+                "size": size,
+                "db_save_ms": best_of(repeat, lambda: db.save_player(world.player)),
+                "db_load_ms": best_of(repeat, db_load),
+                "snapshot_save_ms": best_of(repeat, lambda: write_snapshot(world, snapshot_path)),
+                "snapshot_load_ms": best_of(repeat, lambda: load_snapshot(snapshot_path)),
+                "snapshot_stats_ms": best_of(repeat, stats_only),
+                "snapshot_bytes": os.path.getsize(snapshot_path),
+            })
+        db.conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    columns = ["size", "db_save_ms", "db_load_ms", "snapshot_save_ms", "snapshot_load_ms", "snapshot_stats_ms", "snapshot_bytes"]
+    print("  ".join(f"{column:>17}" for column in columns))
+    for result in run():
+        print("  ".join(f"{result[column]:>17.3f}" if isinstance(result[column], float) else f"{result[column]:>17}" for column in columns))
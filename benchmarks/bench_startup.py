@@ -0,0 +1,51 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold import cost of each entry point, read from `python -X importtime` in a
+# fresh interpreter, plus which heavy dependencies got pulled in on the way.
+# Run from the repository root: python -m benchmarks.bench_startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("game", "headless", "main")
+HEAVY = ("numpy", "pygame", "matplotlib", "rich", "tkinter")
+
+
+def import_times(module):
+    # {module name: cumulative microseconds} for one fresh interpreter
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times, wall_ms
+
+
+def run(modules=MODULES, repeat=5):
+    results = []
+    for module in modules:
+        samples = [import_times(module) for _ in range(repeat)]
+        times = samples[-1][0]
+        results.append({
+            "module": module,
+            "import_ms": statistics.median(t[module] for t, _ in samples) / 1000,
+            "process_ms": statistics.median(wall for _, wall in samples),
+            "heavy": [name for name in HEAVY if name in times],
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'module':>10}  {'import (ms)':>12}  {'process (ms)':>12}  heavy imports")
+    for result in run():
+        heavy = ", ".join(result["heavy"]) or "-"
+        print(f"{result['module']:>10}  {result['import_ms']:>12.1f}  {result['process_ms']:>12.1f}  {heavy}")
@@ -0,0 +1,37 @@
+import time
+from game import ITEM_ROSTER, EnemyStore, GameWorld, Item, Player
+from benchmarks.bench_encounter import make_population, per_call_us
+
+# How encounter_enemy and find_item scale with the number of enemies and
+# items in the world. Run from the repository root:
+# python -m benchmarks.bench_world
+
+
+def make_world(size, seed):
+    world = GameWorld(Player("Bench"), seed)
+    world.player.level = 5
+    world.enemies = EnemyStore()
+    world.enemies.extend(*make_population(size, seed))
+    world.items = [Item(f"Item {index}", ITEM_ROSTER[index % len(ITEM_ROSTER)][1]) for index in range(size)]
+    return world
+
+
+def run(sizes=(10**2, 10**3, 10**4, 10**5, 10**6), seed=0, finds=1000):
+    results = []
+    for size in sizes:
+        world = make_world(size, seed)
+        encounter_us = per_call_us(world.encounter_enemy)
+        # each find removes an item, so only take a small fraction of the pool
+        calls = max(1, min(finds, size // 10))
+        start = time.perf_counter()
+        for _ in range(calls):
+            world.find_item()
+        find_item_us = (time.perf_counter() - start) / calls * 1e6
+        results.append({"size": size, "encounter_us": encounter_us, "find_item_us": find_item_us})
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'size':>10}  {'encounter (us)':>15}  {'find_item (us)':>15}")
+    for result in run():
+        print(f"{result['size']:>10}  {result['encounter_us']:>15.2f}  {result['find_item_us']:>15.2f}")
@@ -0,0 +1,115 @@
+import argparse
+import importlib
+import json
+import platform
+import subprocess
+import sys
+import time
+
+# Runs the benchmark suite with fixed seeds and writes one JSON document, so
+# runs can be diffed and compared. With --compare, metrics that got worse by
+# more than --threshold are listed and the exit status is 1.
+# Run from the repository root: python -m benchmarks.run --out results.json
+
+SEED = 0
+# name: (module, full-size arguments, --quick arguments)
+SUITES = {
+    "battle": ("benchmarks.bench_battle", {"battles": 20_000}, {"battles": 2_000}),
+    "world": ("benchmarks.bench_world", {"sizes": (10**2, 10**3, 10**4, 10**5, 10**6)}, {"sizes": (10**2, 10**4)}),
+    "encounter": ("benchmarks.bench_encounter", {"sizes": (10**3, 10**4, 10**5, 10**6)}, {"sizes": (10**3, 10**4)}),
+    "inventory": ("benchmarks.bench_inventory", {"sizes": (10, 10**3, 10**5)}, {"sizes": (10, 10**3), "uses": 2_000}),
+    "database": ("benchmarks.bench_database", {"sizes": (10**3, 10**4, 10**5, 10**6)}, {"sizes": (10**3, 10**4), "samples": 50}),
+    "snapshot": ("benchmarks.bench_snapshot", {"sizes": (10, 1000, 10000)}, {"sizes": (10, 1000)}),
+    "render": ("benchmarks.bench_render", {"frames": 2000}, {"frames": 200}),
+    "startup": ("benchmarks.bench_startup", {"repeat": 5}, {"repeat": 1}),
+}
+# suites whose run() takes no seed
+UNSEEDED = ("snapshot", "startup")
+
+
+def describe():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": SEED,
+    }
+
+
+def run_suite(name, quick=False):
+    module, full, small = SUITES[name]
+    kwargs = dict(small if quick else full)
+    if name not in UNSEEDED:
+        kwargs["seed"] = SEED
+    start = time.perf_counter()
+    results = importlib.import_module(module).run(**kwargs)
+    return {"seconds": time.perf_counter() - start, "results": results}
+
+
+def metric_direction(key):
+    # 1 when bigger is better, -1 when smaller is better, 0 for labels and sizes
+    if key.endswith("_per_s"):
+        return 1
+    if key.endswith(("_ms", "_us")):
+        return -1
+    return 0
+
+
+def compare(old, new, threshold):
+    # Pairs results by suite and position and returns the metrics that moved
+    # the wrong way by more than threshold (0.2 = 20%)
+    regressions = []
+    for name, suite in new["suites"].items():
+        previous = old["suites"].get(name)
+        if previous is None:
+            continue
+        for before, after in zip(previous["results"], suite["results"]):
+            for key, value in after.items():
+                direction = metric_direction(key)
+                if not direction or not before.get(key):
+                    continue
+                change = (value - before[key]) / before[key]
+                if -direction * change > threshold:
+                    label = ", ".join(f"{k}={v}" for k, v in after.items() if not metric_direction(k) and not isinstance(v, float))
+                    regressions.append((name, label, key, before[key], value, change))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("suites", nargs="*", metavar="SUITE",
+                        help=f"suites to run (default: all of {', '.join(SUITES)})")
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--out", default=None, help="write the JSON results here")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite {unknown[0]!r}")
+
+    report = {"meta": describe(), "quick": args.quick, "suites": {}}
+    for name in args.suites or SUITES:
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        report["suites"][name] = run_suite(name, args.quick)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for name, label, key, before, after, change in regressions:
+            print(f"REGRESSION {name} [{label}] {key}: {before:.4g} -> {after:.4g} ({change:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%}", file=sys.stderr)
@@ -0,0 +1,108 @@
+import random
+
+# Item effects, registered once by name. Each effect has a scalar form that
+# updates one Player and a batch form that updates NumPy columns of player
+# stats ("health", "attack_power", "level", "experience") in one pass. numpy
+# is only imported by the batch helpers, so scalar use stays cheap to load.
+
+PLAYER_COLUMNS = ("health", "attack_power", "level", "experience")
+RANDOM_EFFECTS = ("heal", "boost", "level_up")
+
+
+class Effect:
+    def __init__(self, name, apply, apply_batch):
+        self.name = name
+        self.apply = apply
+        self.apply_batch = apply_batch
+
+
+EFFECTS = {}
+
+
+def register_effect(name, apply, apply_batch):
+    EFFECTS[name] = Effect(name, apply, apply_batch)
+    return EFFECTS[name]
+
+
+def heal(player, rng):
+    player.health += 20
+    return f"{player.name} heals 20 health."
+
+
+def heal_batch(columns, mask, rng):
+    columns["health"][mask] += 20
+
+
+def boost(player, rng):
+    player.attack_power += 5
+    return f"{player.name} gains 5 attack power."
+
+
+def boost_batch(columns, mask, rng):
+    columns["attack_power"][mask] += 5
+
+
+def level_up(player, rng):
+    player.gain_experience(player.level * 10)
+    return f"{player.name} gains enough experience to level up!"
+
+
+def level_up_batch(columns, mask, rng):
+    # same rules as Player.gain_experience followed by Player.level_up
+    level = columns["level"]
+    experience = columns["experience"]
+    experience[mask] += level[mask] * 10
+    leveled = mask & (experience >= level * 10)
+    level[leveled] += 1
+    columns["health"][leveled] += 20
+    columns["attack_power"][leveled] += 5
+    experience[leveled] = 0
+
+
+def random_effect(player, rng):
+    # resolve to one concrete effect instead of re-entering Item.use
+    return EFFECTS[rng.choice(RANDOM_EFFECTS)].apply(player, rng)
+
+
+def random_effect_batch(columns, mask, rng):
+    picks = rng.integers(len(RANDOM_EFFECTS), size=len(mask))
+    for index, name in enumerate(RANDOM_EFFECTS):
+        EFFECTS[name].apply_batch(columns, mask & (picks == index), rng)
+
+
+register_effect("heal", heal, heal_batch)
+register_effect("boost", boost, boost_batch)
+register_effect("level_up", level_up, level_up_batch)
+register_effect("random", random_effect, random_effect_batch)
+
+
+def apply_effect(name, player, rng=random):
+    effect = EFFECTS.get(name)
+    if effect is None:
+        return "Nothing happens."
+    return effect.apply(player, rng)
+
+
+def apply_effect_batch(name, columns, mask=None, rng=None):
+    # Applies an effect to every player selected by mask (all by default)
+    import numpy as np
+    effect = EFFECTS.get(name)
+    if effect is None:
+        return columns
+    if mask is None:
+        mask = np.ones(len(columns["health"]), dtype=bool)
+    effect.apply_batch(columns, mask, np.random.default_rng(rng))
+    return columns
+
+
+def player_columns(players):
+    import numpy as np
+    return {column: np.array([getattr(player, column) for player in players], dtype=np.int64)
+            for column in PLAYER_COLUMNS}
+
+
+def write_player_columns(players, columns):
+    for column in PLAYER_COLUMNS:
+        for player, value in zip(players, columns[column].tolist()):
+            if getattr(player, column) != value:
+                setattr(player, column, value)
@@ -0,0 +1,1618 @@
+import heapq
+import itertools
+import queue
+from collections import OrderedDict
+import random
+import sqlite3
+import sys
+import threading
+import time
+from effects import apply_effect
+from instrumentation import connect
+
+# The game itself, with no GUI toolkit imported. numpy, the battle solver,
+# rich and matplotlib are imported by the features that use them, so this
+# module loads in a few milliseconds.
+
+console = None
+
+def get_console():
+    global console
+    if console is None:
+        from rich.console import Console
+        console = Console()
+    return console
+
+PLAYER_FIELDS = ("health", "attack_power", "level", "experience", "quests_completed")
+AUTOSAVE_INTERVAL = 5.0
+QUEST_OBJECTIVES = {
+    "Defeat 5 Goblins": ("kill", "Goblin", 5),
+    "Collect 3 Healing Herbs": ("collect", "Healing Herb", 3),
+    "Find the Magic Stone": ("collect", "Magic Stone", 1),
+    "Defeat the Dragon": ("kill", "Dragon", 1),
+    "Help the Villager": None,
+    "Find the Lost Sword": ("collect", "Lost Sword", 1),
+}
+PLAYER_CACHE_SIZE = 256
+# board name: ranking columns, best first; player_id breaks ties
+LEADERBOARDS = {
+    "level": ("level", "experience"),
+    "quests": ("quests_completed",),
+    "items": ("item_count",),
+}
+LEADERBOARD_PAGE_SIZE = 20
+# Battle events are (kind, actor, target, value) tuples, formatted on demand
+ATTACK, SPECIAL_ATTACK, VICTORY, DEFEAT, QUEST_COMPLETED, LEVEL_UP = range(6)
+EVENT_FORMATS = (
+    "{0} attacks {1} for {2} damage.",
+    "{0} performs a special attack on {1} for {2} damage!",
+    "{0} defeated {1}!",
+    "{0} has been defeated by {1}.",
+    "Quest completed: {1}",
+    "{0} has leveled up to level {2}!",
+)
+ENEMY_ROSTER = (
+    ("Goblin", 30, 5, 5),
+    ("Orc", 50, 8, 8),
+    ("Dragon", 100, 15, 20),
+    ("Troll", 40, 6, 6),
+    ("Vampire", 70, 10, 15),
+    ("Slime", 20, 3, 3),
+    ("Zombie", 60, 7, 10),
+    ("Bandit", 50, 9, 8),
+)
+ITEM_ROSTER = (
+    ("Health Potion", "heal"),
+    ("Strength Elixir", "boost"),
+    ("Magic Stone", "boost"),
+    ("Healing Herb", "heal"),
+    ("Experience Scroll", "level_up"),
+    ("Revive Potion", "revive"),
+    ("Energy Drink", "boost"),
+    ("Mystery Box", "random"),
+)
+MAP_PATH = "world.map"
+MAP_SIZE = 4096
+VIEW_RADIUS = 16
+LOAD_BATCH_SIZE = 500
+
+class NumpyRandom:
+    # Adapts a numpy Generator to the parts of the random module the game uses
+    def __init__(self, generator):
+        self.generator = generator
+
+    def random(self):
+        return float(self.generator.random())
+
+    def randint(self, a, b):
+        return int(self.generator.integers(a, b + 1))
+
+    def choice(self, seq):
+        return seq[int(self.generator.integers(len(seq)))]
+
+def make_rng(rng=None):
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(rng, np.random.Generator):
+        return NumpyRandom(rng)
+    return rng
+
+def format_event(event):
+    kind, actor, target, value = event
+    return EVENT_FORMATS[kind].format(actor, target, value)
+
+class GameDatabase:
+    def __init__(self, db_name="rpg_game.db"):
+        self.db_name = db_name
+        self.conn = connect(db_name)
+        self.cache = PlayerCache()
+        self.data_version = None
+        self.configure()
+        self.create_tables()
+
+    def configure(self):
+        # WAL lets readers run alongside a writer and makes commits a single
+        # append; NORMAL sync is durable across application crashes in WAL mode
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-16000")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS players (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    health INTEGER,
+                    attack_power INTEGER,
+                    level INTEGER,
+                    experience INTEGER,
+                    quests_completed INTEGER
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS inventory (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    player_id INTEGER,
+                    item_name TEXT,
+                    quantity INTEGER,
+                    effect TEXT,
+                    FOREIGN KEY (player_id) REFERENCES players (id)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS quests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    player_id INTEGER,
+                    description TEXT,
+                    is_completed INTEGER,
+                    position INTEGER,
+                    progress INTEGER DEFAULT 0,
+                    FOREIGN KEY (player_id) REFERENCES players (id)
+                )
+            """)
+            self.remove_duplicate_players()
+            if "effect" not in self.table_columns("inventory"):
+                self.conn.execute("ALTER TABLE inventory ADD COLUMN effect TEXT")
+            self.merge_inventory_stacks()
+            self.number_quests()
+            if "progress" not in self.table_columns("quests"):
+                self.conn.execute("ALTER TABLE quests ADD COLUMN progress INTEGER DEFAULT 0")
+            self.add_objective_totals()
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_players_name ON players (name)")
+            # the (player_id, ...) keys double as the per-player lookup indexes
+            self.conn.execute("DROP INDEX IF EXISTS idx_inventory_player")
+            self.conn.execute("DROP INDEX IF EXISTS idx_quests_player")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_item ON inventory (player_id, item_name)")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_quests_position ON quests (player_id, position)")
+            self.create_rankings()
+
+    def create_rankings(self):
+        # player_rankings holds one row per player with the ranked stats and
+        # their total item count; level_counts holds players per level. Both
+        # are kept current by triggers, so saves pay a few index updates and
+        # leaderboards never scan players or inventory.
+        if "player_rankings" not in self.table_names():
+            self.conn.execute("""
+                CREATE TABLE player_rankings (
+                    player_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    level INTEGER NOT NULL,
+                    experience INTEGER NOT NULL,
+                    quests_completed INTEGER NOT NULL,
+                    item_count INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                INSERT INTO player_rankings
+                SELECT p.id, p.name, COALESCE(p.level, 0), COALESCE(p.experience, 0),
+                       COALESCE(p.quests_completed, 0), COALESCE(SUM(i.quantity), 0)
+                FROM players AS p
+                LEFT JOIN inventory AS i ON i.player_id = p.id
+                GROUP BY p.id
+            """)
+        if "level_counts" not in self.table_names():
+            self.conn.execute("CREATE TABLE level_counts (level INTEGER PRIMARY KEY, players INTEGER NOT NULL)")
+            self.conn.execute("""
+                INSERT INTO level_counts
+                SELECT level, COUNT(*) FROM player_rankings GROUP BY level
+            """)
+        for board, columns in LEADERBOARDS.items():
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_rankings_{board} ON player_rankings ({', '.join(columns)}, player_id)"
+            )
+        # one statement per execute: executescript would commit the migration halfway
+        for trigger in (
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_player_insert AFTER INSERT ON players BEGIN
+                INSERT INTO player_rankings (player_id, name, level, experience, quests_completed, item_count)
+                VALUES (NEW.id, NEW.name, COALESCE(NEW.level, 0), COALESCE(NEW.experience, 0),
+                        COALESCE(NEW.quests_completed, 0), 0);
+                INSERT INTO level_counts (level, players) VALUES (COALESCE(NEW.level, 0), 1)
+                    ON CONFLICT (level) DO UPDATE SET players = players + 1;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_player_update
+            AFTER UPDATE OF name, level, experience, quests_completed ON players BEGIN
+                UPDATE player_rankings SET
+                    name = NEW.name,
+                    level = COALESCE(NEW.level, 0),
+                    experience = COALESCE(NEW.experience, 0),
+                    quests_completed = COALESCE(NEW.quests_completed, 0)
+                WHERE player_id = NEW.id;
+                UPDATE level_counts SET players = players - 1
+                    WHERE level = COALESCE(OLD.level, 0) AND COALESCE(OLD.level, 0) != COALESCE(NEW.level, 0);
+                INSERT INTO level_counts (level, players)
+                    SELECT COALESCE(NEW.level, 0), 1 WHERE COALESCE(OLD.level, 0) != COALESCE(NEW.level, 0)
+                    ON CONFLICT (level) DO UPDATE SET players = players + 1;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_player_delete AFTER DELETE ON players BEGIN
+                DELETE FROM player_rankings WHERE player_id = OLD.id;
+                UPDATE level_counts SET players = players - 1 WHERE level = COALESCE(OLD.level, 0);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_item_insert AFTER INSERT ON inventory BEGIN
+                UPDATE player_rankings SET item_count = item_count + COALESCE(NEW.quantity, 0)
+                WHERE player_id = NEW.player_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_item_update AFTER UPDATE OF quantity ON inventory BEGIN
+                UPDATE player_rankings
+                SET item_count = item_count - COALESCE(OLD.quantity, 0) + COALESCE(NEW.quantity, 0)
+                WHERE player_id = NEW.player_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS rankings_item_delete AFTER DELETE ON inventory BEGIN
+                UPDATE player_rankings SET item_count = item_count - COALESCE(OLD.quantity, 0)
+                WHERE player_id = OLD.player_id;
+            END
+            """,
+        ):
+            self.conn.execute(trigger)
+
+    def table_names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+
+    def table_columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def has_index(self, name):
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)
+        ).fetchone()
+        return row is not None
+
+    def remove_duplicate_players(self):
+        # Older saves inserted a new row on every save; keep the latest one
+        if self.has_index("idx_players_name"):
+            return
+        self.conn.execute("""
+            DELETE FROM players WHERE id NOT IN (SELECT MAX(id) FROM players GROUP BY name)
+        """)
+        self.conn.execute("DELETE FROM inventory WHERE player_id NOT IN (SELECT id FROM players)")
+        self.conn.execute("DELETE FROM quests WHERE player_id NOT IN (SELECT id FROM players)")
+
+    def merge_inventory_stacks(self):
+        # Inventory rows are keyed by (player, item name); fold older duplicates
+        if self.has_index("idx_inventory_item"):
+            return
+        self.conn.execute("""
+            UPDATE inventory SET quantity = (
+                SELECT SUM(quantity) FROM inventory AS other
+                WHERE other.player_id = inventory.player_id AND other.item_name = inventory.item_name
+            )
+            WHERE id IN (SELECT MIN(id) FROM inventory GROUP BY player_id, item_name)
+        """)
+        self.conn.execute("""
+            DELETE FROM inventory WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY player_id, item_name)
+        """)
+
+    def add_objective_totals(self):
+        # Quest progress is the player's running total for the objective minus
+        # the total when the quest was accepted, so an event rewrites one
+        # total instead of every quest waiting on it. Older rows only have a
+        # progress count; against a total of 0 that is a start of -progress.
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS objective_totals (
+                player_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                target TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (player_id, kind, target)
+            ) WITHOUT ROWID
+        """)
+        if "start_total" not in self.table_columns("quests"):
+            self.conn.execute("ALTER TABLE quests ADD COLUMN start_total INTEGER")
+            self.conn.execute("UPDATE quests SET start_total = -COALESCE(progress, 0)")
+
+    def number_quests(self):
+        # Quests are keyed by their position in the player's quest log
+        if "position" in self.table_columns("quests"):
+            return
+        self.conn.execute("ALTER TABLE quests ADD COLUMN position INTEGER")
+        self.conn.execute("""
+            UPDATE quests SET position = (
+                SELECT COUNT(*) FROM quests AS other
+                WHERE other.player_id = quests.player_id AND other.id < quests.id
+            )
+        """)
+
+    def save_player(self, player):
+        with self.conn:
+            cur = self.conn.cursor()
+            cur.execute("""
+                INSERT INTO players (name, health, attack_power, level, experience, quests_completed)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    health=excluded.health,
+                    attack_power=excluded.attack_power,
+                    level=excluded.level,
+                    experience=excluded.experience,
+                    quests_completed=excluded.quests_completed
+            """, (player.name, player.health, player.attack_power, player.level, player.experience, player.quests_completed))
+            player_id = cur.execute("SELECT id FROM players WHERE name=?", (player.name,)).fetchone()[0]
+            cur.execute("DELETE FROM inventory WHERE player_id=?", (player_id,))
+            cur.executemany("""
+                INSERT INTO inventory (player_id, item_name, quantity, effect)
+                VALUES (?, ?, ?, ?)
+            """, [(player_id, item.name, item.quantity, item.effect) for item in player.inventory])
+            cur.execute("DELETE FROM quests WHERE player_id=?", (player_id,))
+            cur.executemany("""
+                INSERT INTO quests (player_id, position, description, is_completed, progress, start_total)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(player_id, position, quest.description, int(quest.is_completed), quest.progress, quest.start)
+                  for position, quest in enumerate(player.quests)])
+            cur.execute("DELETE FROM objective_totals WHERE player_id=?", (player_id,))
+            cur.executemany(
+                "INSERT INTO objective_totals (player_id, kind, target, total) VALUES (?, ?, ?, ?)",
+                [(player_id, kind, target, total) for (kind, target), total in player.quest_tracker.totals.items()],
+            )
+        player.clear_changes()
+        self.cache.invalidate(player.name)
+        return player_id
+
+    def apply_changes(self, batch):
+        # Writes the diffs from Player.collect_changes in a single transaction
+        with self.conn:
+            cur = self.conn.cursor()
+            for changes in batch:
+                self.cache.invalidate(changes["name"])
+                cur.execute("INSERT INTO players (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (changes["name"],))
+                player_id = cur.execute("SELECT id FROM players WHERE name=?", (changes["name"],)).fetchone()[0]
+                fields = [field for field in PLAYER_FIELDS if field in changes["fields"]]
+                if fields:
+                    assignments = ", ".join(f"{field}=?" for field in fields)
+                    values = [changes["fields"][field] for field in fields]
+                    cur.execute(f"UPDATE players SET {assignments} WHERE id=?", (*values, player_id))
+                items = changes["items"].items()
+                cur.executemany("""
+                    INSERT INTO inventory (player_id, item_name, quantity, effect)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (player_id, item_name) DO UPDATE SET
+                        quantity=excluded.quantity,
+                        effect=excluded.effect
+                """, [(player_id, name, quantity, effect) for name, (quantity, effect) in items if quantity > 0])
+                cur.executemany(
+                    "DELETE FROM inventory WHERE player_id=? AND item_name=?",
+                    [(player_id, name) for name, (quantity, effect) in items if quantity <= 0],
+                )
+                cur.executemany("""
+                    INSERT INTO quests (player_id, position, description, is_completed, progress, start_total)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (player_id, position) DO UPDATE SET
+                        description=excluded.description,
+                        is_completed=excluded.is_completed,
+                        progress=excluded.progress,
+                        start_total=excluded.start_total
+                """, [(player_id, position, *quest)
+                      for position, quest in changes["quests"].items()])
+                cur.executemany("""
+                    INSERT INTO objective_totals (player_id, kind, target, total)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (player_id, kind, target) DO UPDATE SET total=excluded.total
+                """, [(player_id, kind, target, total)
+                      for (kind, target), total in changes["objectives"].items()])
+
+    def player_exists(self, player_name):
+        row = self.conn.execute("SELECT 1 FROM players WHERE name=?", (player_name,)).fetchone()
+        return row is not None
+
+    def load_player(self, player_name):
+        return self.load_players([player_name]).get(player_name)
+
+    def load_players(self, names):
+        # Rows are cached, not Player objects, so every load hands out a fresh
+        # Player that no earlier caller can have changed. The rest are fetched
+        # in batches with two set-based queries per batch instead of three per
+        # player.
+        self.check_cache()
+        found = {}
+        missing = []
+        for name in dict.fromkeys(names):
+            record = self.cache.get(name)
+            if record is None:
+                missing.append(name)
+            else:
+                found[name] = record
+        for start in range(0, len(missing), LOAD_BATCH_SIZE):
+            for name, record in self.fetch_players(missing[start:start + LOAD_BATCH_SIZE]).items():
+                self.cache.put(name, record)
+                found[name] = record
+        return {name: build_player(found[name]) for name in dict.fromkeys(names) if name in found}
+
+    def check_cache(self):
+        # data_version changes when any other connection commits, whether the
+        # autosave thread or another process; our own saves invalidate by name
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.data_version:
+            self.cache.clear()
+            self.data_version = version
+
+    def fetch_players(self, names):
+        # {name: (stats, items, quests, objective totals)} as plain rows
+        marks = ", ".join("?" * len(names))
+        records = {}
+        rows = self.conn.execute(f"""
+            SELECT p.id, p.name, p.health, p.attack_power, p.level, p.experience, p.quests_completed,
+                   i.item_name, i.quantity, i.effect
+            FROM players AS p
+            LEFT JOIN inventory AS i ON i.player_id = p.id
+            WHERE p.name IN ({marks})
+            ORDER BY p.id, i.id
+        """, names)
+        for row in rows:
+            record = records.get(row[0])
+            if record is None:
+                record = records[row[0]] = (row[1:7], [], [], {})
+            if row[7] is not None:
+                record[1].append((row[7], row[9] or "", row[8]))
+        rows = self.conn.execute(f"""
+            SELECT q.player_id, q.description, q.is_completed, q.progress, q.start_total
+            FROM quests AS q
+            JOIN players AS p ON p.id = q.player_id
+            WHERE p.name IN ({marks})
+            ORDER BY q.player_id, q.position
+        """, names)
+        for player_id, description, is_completed, progress, start in rows:
+            records[player_id][2].append((description, bool(is_completed), progress or 0, start))
+        rows = self.conn.execute(f"""
+            SELECT o.player_id, o.kind, o.target, o.total
+            FROM objective_totals AS o
+            JOIN players AS p ON p.id = o.player_id
+            WHERE p.name IN ({marks})
+        """, names)
+        for player_id, kind, target, total in rows:
+            records[player_id][3][(kind, target)] = total
+        return {record[0][0]: record for record in records.values()}
+
+    def leaderboard(self, board="level", limit=LEADERBOARD_PAGE_SIZE, after=None):
+        # One page of a leaderboard, best first. Returns (rows, cursor); pass
+        # the cursor back as after= for the next page, which seeks straight
+        # to it through the board's index however deep the page is.
+        columns = LEADERBOARDS.get(board)
+        if columns is None:
+            raise ValueError(f"unknown leaderboard {board!r}")
+        if limit < 1:
+            raise ValueError(f"leaderboard pages need at least one row, not {limit}")
+        keys = (*columns, "player_id")
+        rank = 0
+        where = ""
+        params = []
+        if after is not None:
+            rank, *params = after
+            where = f"WHERE ({', '.join(keys)}) < ({', '.join('?' * len(keys))})"
+        rows = self.conn.execute(f"""
+            SELECT player_id, name, level, experience, quests_completed, item_count
+            FROM player_rankings {where}
+            ORDER BY {', '.join(f'{key} DESC' for key in keys)}
+            LIMIT ?
+        """, (*params, limit)).fetchall()
+        page = []
+        for rank, row in enumerate(rows, rank + 1):
+            page.append({
+                "rank": rank,
+                "player_id": row[0],
+                "name": row[1],
+                "level": row[2],
+                "experience": row[3],
+                "quests_completed": row[4],
+                "item_count": row[5],
+            })
+        cursor = None
+        if len(page) == limit:
+            cursor = (rank, *(page[-1][key] for key in keys))
+        return page, cursor
+
+    def iter_leaderboard(self, board="level", page_size=LEADERBOARD_PAGE_SIZE):
+        after = None
+        while True:
+            page, after = self.leaderboard(board, page_size, after)
+            if page:
+                yield page
+            if after is None:
+                return
+
+    def level_distribution(self):
+        return self.conn.execute("SELECT level, players FROM level_counts WHERE players > 0 ORDER BY level").fetchall()
+
+def display_leaderboard(db, board="level", page_size=LEADERBOARD_PAGE_SIZE, pages=None):
+    # Prints one table per page as it is fetched, so the first rows show up
+    # straight away however many players there are
+    from rich.table import Table
+    console = get_console()
+    for number, page in enumerate(db.iter_leaderboard(board, page_size), 1):
+        table = Table(title=f"Leaderboard: {board} (page {number})")
+        table.add_column("Rank", justify="right", style="cyan", no_wrap=True)
+        table.add_column("Player", style="magenta")
+        table.add_column("Level", justify="right")
+        table.add_column("Experience", justify="right")
+        table.add_column("Quests", justify="right")
+        table.add_column("Items", justify="right")
+        for row in page:
+            table.add_row(str(row["rank"]), row["name"], str(row["level"]), str(row["experience"]),
+                          str(row["quests_completed"]), str(row["item_count"]))
+        console.print(table)
+        if pages is not None and number >= pages:
+            break
+
+def build_player(record):
+    (name, health, attack_power, level, experience, quests_completed), items, quests, totals = record
+    player = Player(name)
+    player.health = health
+    player.attack_power = attack_power
+    player.level = level
+    player.experience = experience
+    player.quests_completed = quests_completed
+    for item_name, effect, quantity in items:
+        player.add_item(Item(item_name, effect, quantity))
+    player.quest_tracker.totals.update(totals)
+    for description, is_completed, progress, start in quests:
+        quest = Quest(description)
+        quest.is_completed = is_completed
+        quest.progress = progress
+        quest.start = start
+        player.accept_quest(quest)
+    player.clear_changes()
+    return player
+
+class PlayerCache:
+    # Size-bounded LRU of loaded player rows, keyed by name
+    def __init__(self, maxsize=PLAYER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.players = OrderedDict()
+
+    def get(self, name):
+        player = self.players.get(name)
+        if player is not None:
+            self.players.move_to_end(name)
+        return player
+
+    def put(self, name, record):
+        self.players[name] = record
+        self.players.move_to_end(name)
+        while len(self.players) > self.maxsize:
+            self.players.popitem(last=False)
+
+    def invalidate(self, name):
+        self.players.pop(name, None)
+
+    def clear(self):
+        self.players.clear()
+
+class AutosaveWriter:
+    # Write-behind saving: the UI thread only collects the fields that changed,
+    # a background thread merges them and commits one transaction per interval
+    STOP = object()
+
+    def __init__(self, db_name, interval=AUTOSAVE_INTERVAL):
+        self.db_name = db_name
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def submit(self, player):
+        changes = player.collect_changes()
+        if changes:
+            self.queue.put(changes)
+
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+        if self.error:
+            raise self.error
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(self.STOP)
+            self.thread.join()
+
+    def merge(self, pending, changes):
+        current = pending.get(changes["name"])
+        if current is None:
+            pending[changes["name"]] = changes
+            return
+        current["fields"].update(changes["fields"])
+        current["items"].update(changes["items"])
+        current["quests"].update(changes["quests"])
+        current["objectives"].update(changes["objectives"])
+
+    def run(self):
+        db = GameDatabase(self.db_name)
+        pending = {}
+        waiters = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                message = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                message = None
+            if message is self.STOP:
+                stopping = True
+            elif isinstance(message, threading.Event):
+                waiters.append(message)
+            elif message is not None:
+                self.merge(pending, message)
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+            due = deadline is not None and time.monotonic() >= deadline
+            if pending and (due or waiters or stopping):
+                try:
+                    db.apply_changes(list(pending.values()))
+                    pending.clear()
+                    self.error = None
+                except sqlite3.Error as error:
+                    # keep the batch and retry on the next interval
+                    self.error = error
+                deadline = time.monotonic() + self.interval if pending else None
+            for waiter in waiters:
+                waiter.set()
+            waiters.clear()
+        db.conn.close()
+
+class Inventory:
+    # Item stacks keyed by name, kept in the order they were first picked up
+    def __init__(self):
+        self.stacks = {}
+
+    def __len__(self):
+        return len(self.stacks)
+
+    def __iter__(self):
+        return iter(self.stacks.values())
+
+    def __contains__(self, name):
+        return name in self.stacks
+
+    def get(self, name):
+        return self.stacks.get(name)
+
+    def add(self, item):
+        self.stacks[item.name] = item
+
+    def remove(self, name):
+        return self.stacks.pop(name)
+
+    def first(self):
+        return next(iter(self.stacks.values()), None)
+
+class Player:
+    def __init__(self, name):
+        self.clear_changes()
+        self.name = name
+        self.health = 100
+        self.attack_power = 10
+        self.level = 1
+        self.experience = 0
+        self.quests_completed = 0
+        self.inventory = Inventory()
+        self.quests = []
+        self.quest_tracker = QuestTracker()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in PLAYER_FIELDS:
+            self._changed_fields.add(name)
+
+    def item_changed(self, item):
+        self._changed_items[item.name] = None
+
+    def quest_changed(self, quest):
+        self._changed_quests[quest.position] = quest
+
+    def clear_changes(self):
+        self._changed_fields = set()
+        self._changed_items = {}
+        self._changed_quests = {}
+        self._changed_objectives = set()
+
+    def mark_all_changed(self):
+        # the next collect_changes then carries the whole player, e.g. a new one
+        self._changed_fields.update(PLAYER_FIELDS)
+        for item in self.inventory:
+            self._changed_items[item.name] = None
+        for quest in self.quests:
+            self._changed_quests[quest.position] = quest
+        self._changed_objectives.update(self.quest_tracker.totals)
+
+    def collect_changes(self):
+        # Snapshot of everything modified since the last call, for AutosaveWriter.
+        # An objective event only dirties its running total, however many
+        # quests are waiting on it.
+        if not (self._changed_fields or self._changed_items or self._changed_quests or self._changed_objectives):
+            return None
+        stacks = {}
+        for name in self._changed_items:
+            item = self.inventory.get(name)
+            stacks[name] = (item.quantity, item.effect) if item else (0, "")
+        changes = {
+            "name": self.name,
+            "fields": {field: getattr(self, field) for field in self._changed_fields},
+            "items": stacks,
+            "quests": {position: (quest.description, int(quest.is_completed), quest.progress, quest.start)
+                       for position, quest in self._changed_quests.items()},
+            "objectives": {key: self.quest_tracker.totals[key] for key in self._changed_objectives},
+        }
+        self.clear_changes()
+        return changes
+
+    def attack(self, enemy, rng=random):
+        return format_event(self.attack_event(enemy, rng))
+
+    def special_attack(self, enemy, rng=random):
+        return format_event(self.special_attack_event(enemy, rng))
+
+    def attack_event(self, enemy, rng=random):
+        damage = rng.randint(1, self.attack_power)
+        enemy.health -= damage
+        return (ATTACK, self.name, enemy.name, damage)
+
+    def special_attack_event(self, enemy, rng=random):
+        damage = rng.randint(self.attack_power, self.attack_power * 2)
+        enemy.health -= damage
+        return (SPECIAL_ATTACK, self.name, enemy.name, damage)
+
+    def add_item(self, item):
+        stack = self.inventory.get(item.name)
+        if stack is None:
+            item.owner = self
+            self.inventory.add(item)
+            self.item_changed(item)
+        else:
+            stack.quantity += item.quantity
+        return f"{self.name} picks up {item.name}."
+
+    def show_inventory(self):
+        inventory_list = [f"{item.name} (x{item.quantity})" for item in self.inventory]
+        return inventory_list if inventory_list else ["No items in inventory."]
+
+    def use_item(self, item_name, rng=random):
+        item = self.inventory.get(item_name)
+        if item:
+            effect_message = item.use(self, rng)
+            item.quantity -= 1
+            if item.quantity <= 0:
+                self.inventory.remove(item.name)
+                item.owner = None
+            return f"{self.name} uses {item.name}. {effect_message}"
+        return "Item not found in inventory."
+
+    def gain_experience(self, exp):
+        self.experience += exp
+        if self.experience >= self.level * 10:
+            self.level_up()
+
+    def level_up(self):
+        self.level += 1
+        self.health += 20
+        self.attack_power += 5
+        self.experience = 0
+        return f"{self.name} has leveled up to level {self.level}!"
+
+    def is_alive(self):
+        return self.health > 0
+
+    def heal(self):
+        self.health = 100
+
+    def accept_quest(self, quest):
+        quest.owner = self
+        quest.position = len(self.quests)
+        self.quests.append(quest)
+        self.quest_tracker.track(quest)
+        self.quest_changed(quest)
+        return f"{self.name} accepts quest: {quest.description}"
+
+    def complete_quest(self, quest):
+        # freeze the live count before the tracker lets go of the quest
+        quest.progress = quest.progress
+        self.quest_tracker.close(quest)
+        quest.is_completed = True
+        self.quests_completed += 1
+        return f"{self.name} completed quest: {quest.description}"
+
+    def record_event(self, kind, target, amount=1):
+        # Feeds a game event to the quest objectives; returns finished quests
+        finished = self.quest_tracker.record(kind, target, amount)
+        if finished is None:
+            return []
+        self._changed_objectives.add((kind, target))
+        for quest in finished:
+            self.complete_quest(quest)
+        return finished
+
+    def display_stats(self):
+        from rich.table import Table
+        table = Table(title=f"{self.name}'s Stats")
+        table.add_column("Attribute", justify="right", style="cyan", no_wrap=True)
+        table.add_column("Value", style="magenta")
+        table.add_row("Health", str(self.health))
+        table.add_row("Attack Power", str(self.attack_power))
+        table.add_row("Level", str(self.level))
+        table.add_row("Experience", str(self.experience))
+        table.add_row("Quests Completed", str(self.quests_completed))
+        get_console().print(table)
+
+    def display_quests(self):
+        from rich.table import Table
+        table = Table(title=f"{self.name}'s Quests")
+        table.add_column("Quest", justify="left", style="cyan", no_wrap=True)
+        table.add_column("Status", style="magenta")
+        for quest in self.quests:
+            status = "Completed" if quest.is_completed else "Incomplete"
+            if quest.objective:
+                status += f" ({quest.progress}/{quest.objective[2]})"
+            table.add_row(quest.description, status)
+        get_console().print(table)
+
+class Quest:
+    def __init__(self, description, objective=None):
+        self.owner = None
+        self.position = None
+        self.objective = objective or QUEST_OBJECTIVES.get(description)
+        self.saved_progress = 0
+        # objective total when the quest was accepted; set by QuestTracker.track
+        self.start = None
+        self.description = description
+        self.is_completed = False
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in ("description", "is_completed", "saved_progress", "start") and self.owner is not None:
+            self.owner.quest_changed(self)
+
+    @property
+    def progress(self):
+        if self.owner is None or self.objective is None or self.is_completed:
+            return self.saved_progress
+        return self.owner.quest_tracker.progress(self)
+
+    @progress.setter
+    def progress(self, value):
+        self.saved_progress = value
+
+class QuestTracker:
+    # Open quests indexed by objective key (kind, target). Each key keeps a
+    # running event total and a heap of the totals at which its quests are
+    # done, so an event costs O(1) plus O(log n) per quest it finishes.
+    def __init__(self):
+        self.totals = {}
+        self.pending = {}
+        self.stale = {}
+        self.queued = set()
+        self.starts = {}
+        self.open = {}
+        self.order = itertools.count()
+
+    def track(self, quest):
+        if quest.is_completed:
+            return
+        self.open[quest] = None
+        if quest.objective is None:
+            return
+        kind, target, count = quest.objective
+        key = (kind, target)
+        total = self.totals.setdefault(key, 0)
+        if quest.start is None:
+            quest.start = total - quest.saved_progress
+        self.starts[quest] = quest.start
+        self.queued.add(quest)
+        heapq.heappush(self.pending.setdefault(key, []), (self.starts[quest] + count, next(self.order), quest))
+
+    def close(self, quest):
+        self.open.pop(quest, None)
+        self.starts.pop(quest, None)
+        if quest not in self.queued:
+            return
+        # closed quests stay in the heap until popped; compact once they are
+        # the majority, so quests finished by hand cannot pile up
+        self.queued.discard(quest)
+        key = quest.objective[:2]
+        heap = self.pending[key]
+        stale = self.stale[key] = self.stale.get(key, 0) + 1
+        if stale * 2 > len(heap):
+            heap[:] = [entry for entry in heap if entry[2] in self.queued]
+            heapq.heapify(heap)
+            self.stale[key] = 0
+
+    def progress(self, quest):
+        kind, target, count = quest.objective
+        start = self.starts.get(quest)
+        if start is None:
+            return quest.saved_progress
+        return min(count, self.totals[(kind, target)] - start)
+
+    def record(self, kind, target, amount=1):
+        key = (kind, target)
+        heap = self.pending.get(key)
+        if not heap:
+            return None
+        total = self.totals[key] = self.totals[key] + amount
+        finished = []
+        while heap and heap[0][0] <= total:
+            quest = heapq.heappop(heap)[2]
+            if quest in self.queued:
+                self.queued.discard(quest)
+                if not quest.is_completed:
+                    finished.append(quest)
+            else:
+                self.stale[key] -= 1
+        if not heap:
+            del self.pending[key]
+            self.stale.pop(key, None)
+        return finished
+
+    def first_open(self):
+        # quests completed behind the tracker's back are dropped lazily
+        while self.open:
+            quest = next(iter(self.open))
+            if not quest.is_completed:
+                return quest
+            self.close(quest)
+        return None
+
+class Enemy:
+    def __init__(self, name, health, attack_power, experience_value):
+        self.name = name
+        self.health = health
+        self.attack_power = attack_power
+        self.experience_value = experience_value
+
+    def attack(self, player, rng=random):
+        return format_event(self.attack_event(player, rng))
+
+    def special_attack(self, player, rng=random):
+        return format_event(self.special_attack_event(player, rng))
+
+    def attack_event(self, player, rng=random):
+        damage = rng.randint(1, self.attack_power)
+        player.health -= damage
+        return (ATTACK, self.name, player.name, damage)
+
+    def special_attack_event(self, player, rng=random):
+        damage = rng.randint(self.attack_power, self.attack_power * 2)
+        player.health -= damage
+        return (SPECIAL_ATTACK, self.name, player.name, damage)
+
+    def is_alive(self):
+        return self.health > 0
+
+class EnemyView:
+    # Lightweight handle on one row of an EnemyStore; behaves like an Enemy
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, enemy_id):
+        self.store = store
+        self.id = enemy_id
+
+    def __eq__(self, other):
+        if isinstance(other, EnemyView):
+            return self.store is other.store and self.id == other.id
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    @property
+    def name(self):
+        return self.store.names[self.store.columns["name_id"][self.store.row(self.id)]]
+
+    @property
+    def health(self):
+        return self.store.get(self.id, "health")
+
+    @health.setter
+    def health(self, value):
+        self.store.set(self.id, "health", value)
+
+    @property
+    def attack_power(self):
+        return self.store.get(self.id, "attack_power")
+
+    @attack_power.setter
+    def attack_power(self, value):
+        self.store.set(self.id, "attack_power", value)
+
+    @property
+    def experience_value(self):
+        return self.store.get(self.id, "experience_value")
+
+    @experience_value.setter
+    def experience_value(self, value):
+        self.store.set(self.id, "experience_value", value)
+
+    def detach(self):
+        return Enemy(self.name, self.health, self.attack_power, self.experience_value)
+
+    attack = Enemy.attack
+    special_attack = Enemy.special_attack
+    attack_event = Enemy.attack_event
+    special_attack_event = Enemy.special_attack_event
+    is_alive = Enemy.is_alive
+
+class HealthIndex:
+    # Enemy ids bucketed by health, with a Fenwick tree over bucket sizes.
+    # Counting and uniformly sampling the enemies at or below a health limit
+    # both take O(log max_health) and allocate nothing.
+    def __init__(self, max_health=256):
+        import numpy as np
+        self.buckets = [[] for _ in range(max_health + 1)]
+        self.tree = [0] * (max_health + 2)
+        self.positions = np.zeros(16, dtype=np.int64)
+
+    def key(self, health):
+        return int(health) if health > 0 else 0
+
+    def grow(self, max_health, max_id):
+        if max_id >= len(self.positions):
+            import numpy as np
+            self.positions = np.resize(self.positions, max(max_id + 1, len(self.positions) * 2))
+        if max_health >= len(self.buckets):
+            size = max(max_health + 1, len(self.buckets) * 2)
+            self.buckets.extend([] for _ in range(size - len(self.buckets)))
+            self.rebuild()
+
+    def rebuild(self):
+        tree = [0] * (len(self.buckets) + 1)
+        for index, bucket in enumerate(self.buckets, 1):
+            tree[index] += len(bucket)
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def update(self, health, delta):
+        index = health + 1
+        tree = self.tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def insert(self, enemy_id, health):
+        health = self.key(health)
+        self.grow(health, enemy_id)
+        bucket = self.buckets[health]
+        self.positions[enemy_id] = len(bucket)
+        bucket.append(enemy_id)
+        self.update(health, 1)
+
+    def insert_many(self, enemy_ids, health):
+        import numpy as np
+        health = np.maximum(health, 0)
+        if not len(enemy_ids):
+            return
+        self.grow(int(health.max()), int(enemy_ids.max()))
+        order = np.argsort(health, kind="stable")
+        values, starts, counts = np.unique(health[order], return_index=True, return_counts=True)
+        for value, start, count in zip(values.tolist(), starts.tolist(), counts.tolist()):
+            ids = enemy_ids[order[start:start + count]]
+            bucket = self.buckets[value]
+            self.positions[ids] = np.arange(len(bucket), len(bucket) + count)
+            bucket.extend(ids.tolist())
+        self.rebuild()
+
+    def remove(self, enemy_id, health):
+        health = self.key(health)
+        bucket = self.buckets[health]
+        position = self.positions[enemy_id]
+        last = bucket.pop()
+        if last != enemy_id:
+            bucket[position] = last
+            self.positions[last] = position
+        self.update(health, -1)
+
+    def move(self, enemy_id, old_health, new_health):
+        if self.key(old_health) != self.key(new_health):
+            self.remove(enemy_id, old_health)
+            self.insert(enemy_id, new_health)
+
+    def count_at_most(self, health):
+        # enemies at or below 0 health share bucket 0, so limits below 0 match nothing
+        if health < 0:
+            return 0
+        index = min(self.key(health) + 1, len(self.tree) - 1)
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def nth(self, n):
+        # id of the n-th enemy (0-based) in health order
+        tree = self.tree
+        index = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            probe = index + step
+            if probe < len(tree) and tree[probe] <= n:
+                index = probe
+                n -= tree[probe]
+            step >>= 1
+        return self.buckets[index][n]
+
+    def sample_at_most(self, health, rng):
+        count = self.count_at_most(health)
+        if not count:
+            return None
+        return self.nth(rng.randint(0, count - 1))
+
+    def clear(self):
+        for bucket in self.buckets:
+            bucket.clear()
+        self.tree = [0] * len(self.tree)
+
+class StatGroups:
+    # Enemy ids grouped by their (health, attack_power) pair, with the group
+    # stats and sizes in arrays. Win chances depend only on that pair, so a
+    # band query works on the few hundred groups, not on every enemy.
+    def __init__(self):
+        import numpy as np
+        self.index = {}
+        self.members = []
+        self.count = 0
+        self.health = np.zeros(16, dtype=np.int64)
+        self.attack_power = np.zeros(16, dtype=np.int64)
+        self.sizes = np.zeros(16, dtype=np.int64)
+        self.positions = np.zeros(16, dtype=np.int64)
+
+    def group(self, health, attack_power):
+        import numpy as np
+        key = (int(health) if health > 0 else 0, int(attack_power))
+        group = self.index.get(key)
+        if group is None:
+            group = self.index[key] = self.count
+            if group >= len(self.sizes):
+                size = len(self.sizes) * 2
+                self.health = np.resize(self.health, size)
+                self.attack_power = np.resize(self.attack_power, size)
+                self.sizes = np.resize(self.sizes, size)
+                self.sizes[group:] = 0
+            self.health[group], self.attack_power[group] = key
+            self.members.append([])
+            self.count += 1
+        return group
+
+    def reserve(self, max_id):
+        if max_id >= len(self.positions):
+            import numpy as np
+            self.positions = np.resize(self.positions, max(max_id + 1, len(self.positions) * 2))
+
+    def insert(self, enemy_id, health, attack_power):
+        self.reserve(enemy_id)
+        group = self.group(health, attack_power)
+        members = self.members[group]
+        self.positions[enemy_id] = len(members)
+        members.append(enemy_id)
+        self.sizes[group] += 1
+
+    def insert_many(self, enemy_ids, health, attack_power):
+        import numpy as np
+        if not len(enemy_ids):
+            return
+        self.reserve(int(enemy_ids.max()))
+        keys = (np.maximum(health, 0).astype(np.int64) << 32) | attack_power.astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        values, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        for value, start, count in zip(values.tolist(), starts.tolist(), counts.tolist()):
+            group = self.group(value >> 32, value & 0xFFFFFFFF)
+            ids = enemy_ids[order[start:start + count]]
+            members = self.members[group]
+            self.positions[ids] = np.arange(len(members), len(members) + count)
+            members.extend(ids.tolist())
+            self.sizes[group] += count
+
+    def remove(self, enemy_id, health, attack_power):
+        group = self.group(health, attack_power)
+        members = self.members[group]
+        position = self.positions[enemy_id]
+        last = members.pop()
+        if last != enemy_id:
+            members[position] = last
+            self.positions[last] = position
+        self.sizes[group] -= 1
+
+    def move(self, enemy_id, old_health, old_attack_power, new_health, new_attack_power):
+        if self.group(old_health, old_attack_power) != self.group(new_health, new_attack_power):
+            self.remove(enemy_id, old_health, old_attack_power)
+            self.insert(enemy_id, new_health, new_attack_power)
+
+    def sample(self, groups, rng):
+        # uniform over the enemies in the given groups; None when they are empty
+        import numpy as np
+        if not len(groups):
+            return None
+        totals = np.cumsum(self.sizes[groups])
+        if not totals[-1]:
+            return None
+        n = rng.randint(0, int(totals[-1]) - 1)
+        picked = int(np.searchsorted(totals, n, side="right"))
+        offset = n - (int(totals[picked - 1]) if picked else 0)
+        return self.members[int(groups[picked])][offset]
+
+    def clear(self):
+        for members in self.members:
+            members.clear()
+        self.sizes[:] = 0
+
+class EnemyStore:
+    # Struct-of-arrays enemy population. Rows stay packed (defeated enemies
+    # are swap-removed), while ids stay stable so views survive the moves.
+    COLUMNS = ("name_id", "health", "attack_power", "experience_value")
+
+    def __init__(self, enemies=(), capacity=16):
+        import numpy as np
+        self.size = 0
+        self.columns = {column: np.zeros(capacity, dtype=np.int32) for column in self.COLUMNS}
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.next_id = 0
+        self.names = []
+        self.name_ids = {}
+        self.health_index = HealthIndex()
+        self.groups = StatGroups()
+        for enemy in enemies:
+            self.append(enemy)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for row in range(self.size):
+            yield EnemyView(self, int(self.ids[row]))
+
+    def __getitem__(self, row):
+        if not -self.size <= row < self.size:
+            raise IndexError("enemy row out of range")
+        return EnemyView(self, int(self.ids[row % self.size]))
+
+    def intern(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def reserve(self, count):
+        import numpy as np
+        needed = self.size + count
+        capacity = len(self.ids)
+        if needed > capacity:
+            capacity = max(needed, capacity * 2)
+            for column, values in self.columns.items():
+                self.columns[column] = np.resize(values, capacity)
+            self.ids = np.resize(self.ids, capacity)
+        if self.next_id + count > len(self.rows):
+            self.rows = np.resize(self.rows, max(self.next_id + count, len(self.rows) * 2))
+
+    def add(self, name, health, attack_power, experience_value):
+        self.reserve(1)
+        row = self.size
+        enemy_id = self.next_id
+        self.columns["name_id"][row] = self.intern(name)
+        self.columns["health"][row] = health
+        self.columns["attack_power"][row] = attack_power
+        self.columns["experience_value"][row] = experience_value
+        self.ids[row] = enemy_id
+        self.rows[enemy_id] = row
+        self.size += 1
+        self.next_id += 1
+        self.health_index.insert(enemy_id, health)
+        self.groups.insert(enemy_id, health, attack_power)
+        return EnemyView(self, enemy_id)
+
+    def append(self, enemy):
+        return self.add(enemy.name, enemy.health, enemy.attack_power, enemy.experience_value)
+
+    def extend(self, names, health, attack_power, experience_value):
+        # Bulk insert from parallel sequences, for populations of 10^5+ enemies
+        import numpy as np
+        count = len(health)
+        self.reserve(count)
+        start, stop = self.size, self.size + count
+        self.columns["name_id"][start:stop] = [self.intern(name) for name in names]
+        self.columns["health"][start:stop] = health
+        self.columns["attack_power"][start:stop] = attack_power
+        self.columns["experience_value"][start:stop] = experience_value
+        new_ids = np.arange(self.next_id, self.next_id + count)
+        self.ids[start:stop] = new_ids
+        self.rows[new_ids] = np.arange(start, stop)
+        self.size = stop
+        self.next_id += count
+        self.health_index.insert_many(new_ids, self.columns["health"][start:stop])
+        self.groups.insert_many(new_ids, self.columns["health"][start:stop], self.columns["attack_power"][start:stop])
+
+    def exists(self, enemy_id):
+        return 0 <= enemy_id < self.next_id and self.rows[enemy_id] >= 0
+
+    def row(self, enemy_id):
+        row = self.rows[enemy_id]
+        if row < 0:
+            raise LookupError(f"enemy {enemy_id} has been removed")
+        return row
+
+    def get(self, enemy_id, column):
+        return int(self.columns[column][self.row(enemy_id)])
+
+    def set(self, enemy_id, column, value):
+        row = self.row(enemy_id)
+        health, attack_power = int(self.columns["health"][row]), int(self.columns["attack_power"][row])
+        if column == "health":
+            self.health_index.move(enemy_id, health, value)
+            self.groups.move(enemy_id, health, attack_power, value, attack_power)
+        elif column == "attack_power":
+            self.groups.move(enemy_id, health, attack_power, health, value)
+        self.columns[column][row] = value
+
+    def column(self, column):
+        return self.columns[column][:self.size]
+
+    def remove(self, enemy):
+        # Swap the last row into the hole; returns a detached Enemy copy
+        row = self.row(enemy.id)
+        removed = enemy.detach()
+        self.health_index.remove(enemy.id, removed.health)
+        self.groups.remove(enemy.id, removed.health, removed.attack_power)
+        last = self.size - 1
+        if row != last:
+            for values in self.columns.values():
+                values[row] = values[last]
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.rows[enemy.id] = -1
+        self.size = last
+        return removed
+
+    def clear(self):
+        self.rows[:self.next_id] = -1
+        self.size = 0
+        self.health_index.clear()
+        self.groups.clear()
+
+    def sample_health_at_most(self, health, rng):
+        enemy_id = self.health_index.sample_at_most(health, rng)
+        return None if enemy_id is None else EnemyView(self, enemy_id)
+
+class Item:
+    def __init__(self, name, effect, quantity=1):
+        self.owner = None
+        self.name = name
+        self.effect = effect
+        self.quantity = quantity
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name == "quantity" and self.owner is not None:
+            self.owner.item_changed(self)
+
+    def use(self, player, rng=random):
+        return apply_effect(self.effect, player, rng)
+
+class GameWorld:
+    def __init__(self, player, rng=None):
+        self.player = player
+        self.rng = make_rng(rng)
+        self.enemies = EnemyStore([Enemy(*stats) for stats in ENEMY_ROSTER])
+        self.items = [Item(*item) for item in ITEM_ROSTER]
+        self.current_enemy = None
+        self.tilemap = None
+        self.position = None
+        self.enemy_index = {}
+        self.item_index = {}
+        self.band_cache = None
+
+    def encounter_enemy(self, win_band=None):
+        if self.enemies:
+            if win_band:
+                self.current_enemy = self.sample_in_band(*win_band)
+            else:
+                self.current_enemy = self.enemies.sample_health_at_most(self.player.level * 20, self.rng)
+            if self.current_enemy is None:
+                self.current_enemy = self.enemies[self.rng.randint(0, len(self.enemies) - 1)]
+            return f"A wild {self.current_enemy.name} appears!"
+        self.current_enemy = None
+        return "No more enemies to fight."
+
+    def sample_in_band(self, min_win, max_win):
+        # An enemy the player beats with a chance in [min_win, max_win], or
+        # when none is left in the band, one from the closest group. The win
+        # chance of every stat group is solved once per player state.
+        import numpy as np
+        groups = self.enemies.groups
+        key = (self.enemies, self.player.health, self.player.attack_power, min_win, max_win, groups.count)
+        if self.band_cache is None or self.band_cache[0] != key:
+            from solver import win_chances
+            chances = win_chances(self.player.health, self.player.attack_power,
+                                  groups.health[:groups.count], groups.attack_power[:groups.count])
+            distance = np.maximum(np.maximum(min_win - chances, chances - max_win), 0.0)
+            self.band_cache = (key, np.flatnonzero(distance == 0), distance)
+        _, in_band, distance = self.band_cache
+        enemy_id = groups.sample(in_band, self.rng)
+        if enemy_id is None:
+            occupied = np.flatnonzero(groups.sizes[:groups.count])
+            if not len(occupied):
+                return None
+            closest = distance[occupied].min()
+            enemy_id = groups.sample(occupied[distance[occupied] == closest], self.rng)
+        return EnemyView(self.enemies, enemy_id)
+
+    def find_item(self):
+        if self.items:
+            item = self.rng.choice(self.items)
+            self.items.remove(item)
+            return self.pick_up(item)
+        return "No more items to find."
+
+    def pick_up(self, item):
+        self.player.add_item(item)
+        message = f"{self.player.name} finds a {item.name}!"
+        for quest in self.player.record_event("collect", item.name, item.quantity):
+            message += f" Quest completed: {quest.description}"
+        return message
+
+    def battle(self):
+        return [format_event(event) for event in self.iter_battle()]
+
+    def iter_battle(self):
+        # Yields the fight as event tuples; consume it fully to finish the battle.
+        # A stored enemy fights as a detached copy and its health is written
+        # back once, so the store's indexes move once per battle, not per hit.
+        player, enemy, rng = self.player, self.current_enemy, self.rng
+        view = enemy if isinstance(enemy, EnemyView) else None
+        if view is not None:
+            enemy = view.detach()
+        try:
+            while player.is_alive() and enemy.is_alive():
+                if rng.choice(["attack", "special_attack"]) == "attack":
+                    yield player.attack_event(enemy, rng)
+                else:
+                    yield player.special_attack_event(enemy, rng)
+
+                if enemy.is_alive():
+                    if rng.choice(["attack", "special_attack"]) == "attack":
+                        yield enemy.attack_event(player, rng)
+                    else:
+                        yield enemy.special_attack_event(player, rng)
+        finally:
+            if view is not None and view.store.exists(view.id):
+                view.health = enemy.health
+
+        if player.is_alive():
+            yield (VICTORY, player.name, enemy.name, None)
+            yield from self.claim_victory()
+        else:
+            yield (DEFEAT, player.name, enemy.name, None)
+
+    def claim_victory(self):
+        # Rewards the player for the defeated current_enemy and takes it out
+        # of the world, so it is counted and can be met only once. Returns
+        # the events after VICTORY.
+        player, enemy = self.player, self.current_enemy
+        if not isinstance(enemy, EnemyView) or not self.enemies.exists(enemy.id):
+            # already claimed: a detached copy or an enemy removed elsewhere
+            return []
+        events = []
+        player.gain_experience(enemy.experience_value)
+        for quest in player.record_event("kill", enemy.name):
+            events.append((QUEST_COMPLETED, player.name, quest.description, None))
+        player.level_up()
+        events.append((LEVEL_UP, player.name, None, player.level))
+        self.current_enemy = self.enemies.remove(enemy)
+        return events
+
+    def assign_quest(self):
+        quests = list(QUEST_OBJECTIVES)
+        quest_description = self.rng.choice(quests)
+        quest = Quest(quest_description)
+        self.player.accept_quest(quest)
+        return f"New quest assigned: {quest.description}"
+
+    def complete_quest(self):
+        quest = self.player.quest_tracker.first_open()
+        if quest:
+            self.player.complete_quest(quest)
+            return f"Quest completed: {quest.description}"
+        return "No quests to complete."
+
+    def open_map(self, path=MAP_PATH, size=MAP_SIZE, seed=None):
+        # Opens (or creates) the tile world and places the player near its middle
+        from tilemap import TileMap
+        if seed is None:
+            seed = self.rng.randint(0, 2**31 - 1)
+        self.tilemap = TileMap(path, size, size, seed)
+        self.position = self.tilemap.nearest_open(self.tilemap.width // 2, self.tilemap.height // 2)
+        self.load_chunks_near(self.position)
+        return self.tilemap
+
+    def load_chunk(self, chunk):
+        # Spawns a chunk's enemies and items the first time it comes into view
+        from tilemap import ENEMY_SPAWN
+        if chunk in self.enemy_index:
+            return
+        enemies = self.enemy_index[chunk] = {}
+        items = self.item_index[chunk] = {}
+        for x, y, kind, index in self.tilemap.spawns(*chunk, len(ENEMY_ROSTER), len(ITEM_ROSTER)):
+            if kind == ENEMY_SPAWN:
+                enemies[(x, y)] = self.enemies.add(*ENEMY_ROSTER[index]).id
+            else:
+                items[(x, y)] = Item(*ITEM_ROSTER[index])
+
+    def load_chunks_near(self, position, radius=VIEW_RADIUS):
+        x, y = position
+        for chunk in self.tilemap.chunks_in(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1):
+            self.load_chunk(chunk)
+
+    def move_player(self, dx, dy):
+        if self.tilemap is None:
+            self.open_map()
+        x, y = self.position[0] + dx, self.position[1] + dy
+        if not self.tilemap.passable(x, y):
+            return "The way is blocked."
+        self.position = (x, y)
+        self.current_enemy = None
+        self.load_chunks_near(self.position)
+        chunk = self.tilemap.chunk_of(x, y)
+        enemy_id = self.enemy_index[chunk].get((x, y))
+        if enemy_id is not None:
+            if self.enemies.exists(enemy_id):
+                self.current_enemy = EnemyView(self.enemies, enemy_id)
+                return f"A wild {self.current_enemy.name} appears!"
+            # defeated somewhere else already
+            del self.enemy_index[chunk][(x, y)]
+        item = self.item_index[chunk].pop((x, y), None)
+        if item:
+            return self.pick_up(item)
+        return f"{self.player.name} moves to ({x}, {y})."
+
+    def visible_spawns(self, left, top, width, height):
+        enemies, items = [], []
+        for chunk in self.tilemap.chunks_in(left, top, width, height):
+            self.load_chunk(chunk)
+            for (x, y), enemy_id in self.enemy_index[chunk].items():
+                if left <= x < left + width and top <= y < top + height and self.enemies.exists(enemy_id):
+                    enemies.append((x, y))
+            for x, y in self.item_index[chunk]:
+                if left <= x < left + width and top <= y < top + height:
+                    items.append((x, y))
+        return enemies, items
+
+    def display_map(self, radius=VIEW_RADIUS):
+        # Draws only the tiles around the player, in a window that stays open
+        import matplotlib.pyplot as plt
+        from matplotlib.colors import ListedColormap
+        from tilemap import TERRAIN_COLORS
+        if self.tilemap is None:
+            self.open_map()
+        x, y = self.position
+        left, top, size = x - radius, y - radius, 2 * radius + 1
+        view = self.tilemap.window(left, top, size, size)
+        enemies, items = self.visible_spawns(left, top, size, size)
+        plt.figure(f"{self.player.name}'s Map")
+        plt.clf()
+        extent = (left - 0.5, left + size - 0.5, top + size - 0.5, top - 0.5)
+        plt.imshow(view, cmap=ListedColormap(TERRAIN_COLORS), vmin=0, vmax=len(TERRAIN_COLORS) - 1,
+                   extent=extent, interpolation="nearest")
+        if enemies:
+            plt.scatter(*zip(*enemies), c="red", marker="x", label="Enemy")
+        if items:
+            plt.scatter(*zip(*items), c="gold", marker="*", label="Item")
+        plt.scatter([x], [y], c="white", edgecolors="black", marker="o", label=self.player.name)
+        plt.legend(loc="upper right", fontsize="small")
+        plt.title(f"{self.player.name}'s Map ({x}, {y})")
+        plt.show(block=False)
+        plt.pause(0.001)
@@ -0,0 +1,57 @@
+import argparse
+import sys
+from game import LEADERBOARDS, GameDatabase, GameWorld, Player, display_leaderboard, format_event
+
+# Plays the game without any GUI toolkit: no tkinter, pygame, matplotlib or
+# rich is imported, so scripts and servers start in milliseconds.
+
+
+def explore(world, fight=True, verbose=True):
+    # Same flow as RPGGameApp.explore, with the fight resolved by
+    # GameWorld.iter_battle. With fight=False an encountered enemy is left in
+    # world.current_enemy; with verbose=False battle events are not formatted.
+    if world.rng.choice(["encounter", "item"]) == "encounter":
+        log = [world.encounter_enemy()]
+        if fight and world.current_enemy and world.current_enemy.is_alive():
+            for event in world.iter_battle():
+                if verbose:
+                    log.append(format_event(event))
+        return log
+    return [world.find_item()]
+
+
+def play(world, steps, verbose=True):
+    log = []
+    for _ in range(steps):
+        if not world.player.is_alive():
+            break
+        log.extend(explore(world, verbose=verbose))
+    return log
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play the game headless.")
+    parser.add_argument("--name", default="Hero")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db", default=None, help="save the player to this database when done")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--leaderboard", choices=LEADERBOARDS, default=None,
+                        help="print this leaderboard from --db instead of playing")
+    parser.add_argument("--pages", type=int, default=None, help="stop the leaderboard after this many pages")
+    args = parser.parse_args()
+
+    if args.leaderboard:
+        if not args.db:
+            parser.error("--leaderboard needs --db")
+        display_leaderboard(GameDatabase(args.db), args.leaderboard, pages=args.pages)
+        sys.exit()
+
+    world = GameWorld(Player(args.name), args.seed)
+    log = play(world, args.steps, verbose=not args.quiet)
+    if not args.quiet:
+        print("\n".join(log))
+    player = world.player
+    print(f"Player: {player.name} | Health: {player.health} | Attack Power: {player.attack_power} | Level: {player.level}")
+    if args.db:
+        GameDatabase(args.db).save_player(player)
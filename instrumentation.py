@@ -0,0 +1,225 @@
+import atexit
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+# Opt-in latency metrics. Set RPG_METRICS before starting the game:
+#
+#   RPG_METRICS=1              record, read them with metrics.to_json()
+#   RPG_METRICS=metrics.json   also write JSON there on exit
+#   RPG_METRICS=metrics.prom   ... or Prometheus text
+#
+# When it is unset nothing is wrapped: timed() hands back the undecorated
+# function, databases get a plain sqlite3 connection, and the remaining
+# call sites only test metrics.enabled.
+
+PREFIX = "rpg_"
+# 10 us to about 10 s, four buckets per doubling
+BUCKETS = tuple(1e-5 * 2 ** (step / 4) for step in range(81))
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        # interpolated inside the bucket that holds the rank
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_json(self):
+        with self.lock:
+            return {
+                "histograms": [dict(name=name, labels=dict(labels), **histogram.summary())
+                               for (name, labels), histogram in sorted(self.histograms.items())],
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, le=f'{bound:.6g}')} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum!r}")
+                lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {histogram.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), f, indent=2)
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def timed(name, **labels):
+    # Decorator recording each call's wall time; a no-op when metrics are off
+    def decorate(func):
+        if not metrics.enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+
+def statement_label(sql):
+    return " ".join(sql.split())[:120]
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Times execute calls and the fetches that follow them, per statement
+    statement = ""
+
+    def timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            metrics.observe("sql_seconds", time.perf_counter() - start, statement=self.statement)
+
+    def execute(self, sql, parameters=()):
+        self.statement = statement_label(sql)
+        return self.timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.statement = statement_label(sql)
+        return self.timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self.timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self.timed(super().fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self.timed(super().fetchall)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Connection.execute and the with-block commit skip Python-level
+    # overrides in C, so route them through timed code here
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        start = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            statement = "COMMIT" if exc_type is None else "ROLLBACK"
+            metrics.observe("sql_seconds", time.perf_counter() - start, statement=statement)
+
+
+def connect(path):
+    # sqlite3.connect, with statement timing and a trace hook counting every
+    # statement SQLite runs (executemany rows included) when metrics are on
+    if not metrics.enabled:
+        return sqlite3.connect(path)
+    conn = sqlite3.connect(path, factory=TimedConnection)
+    conn.set_trace_callback(lambda sql: metrics.increment("sql_statements_total"))
+    return conn
+
+
+def setting():
+    return os.environ.get("RPG_METRICS", "")
+
+
+metrics = Metrics(enabled=setting() not in ("", "0"))
+if metrics.enabled and setting() != "1":
+    atexit.register(metrics.write, setting())
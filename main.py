@@ -1,408 +1,278 @@
-import random
-import sqlite3
+from collections import OrderedDict, deque
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import ttk
-import pygame
-import numpy as np
-import matplotlib.pyplot as plt
-from rich.console import Console
-from rich.table import Table
-
-console = Console()
-
-class GameDatabase:
-    def __init__(self, db_name="rpg_game.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
-
-    def create_tables(self):
-        with self.conn:
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS players (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    health INTEGER,
-                    attack_power INTEGER,
-                    level INTEGER,
-                    experience INTEGER,
-                    quests_completed INTEGER
-                )
-            """)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS inventory (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER,
-                    item_name TEXT,
-                    quantity INTEGER,
-                    FOREIGN KEY (player_id) REFERENCES players (id)
-                )
-            """)
-            self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS quests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER,
-                    description TEXT,
-                    is_completed INTEGER,
-                    FOREIGN KEY (player_id) REFERENCES players (id)
-                )
-            """)
-
-    def save_player(self, player):
-        with self.conn:
-            cur = self.conn.cursor()
-            cur.execute("""
-                INSERT INTO players (name, health, attack_power, level, experience, quests_completed)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (player.name, player.health, player.attack_power, player.level, player.experience, player.quests_completed))
-            player_id = cur.lastrowid
-            for item in player.inventory:
-                cur.execute("""
-                    INSERT INTO inventory (player_id, item_name, quantity)
-                    VALUES (?, ?, ?)
-                """, (player_id, item.name, item.quantity))
-            self.conn.commit()
-
-    def load_player(self, player_name):
-        with self.conn:
-            cur = self.conn.cursor()
-            cur.execute("SELECT * FROM players WHERE name=?", (player_name,))
-            row = cur.fetchone()
-            if row:
-                player = Player(row[1])
-                player.health = row[2]
-                player.attack_power = row[3]
-                player.level = row[4]
-                player.experience = row[5]
-                player.quests_completed = row[6]
-                cur.execute("SELECT item_name, quantity FROM inventory WHERE player_id=?", (row[0],))
-                for item_row in cur.fetchall():
-                    item = Item(item_row[0], "", item_row[1])
-                    player.inventory.append(item)
-                cur.execute("SELECT description, is_completed FROM quests WHERE player_id=?", (row[0],))
-                for quest_row in cur.fetchall():
-                    quest = Quest(quest_row[0])
-                    quest.is_completed = quest_row[1]
-                    player.quests.append(quest)
-                return player
-        return None
-
-class Player:
-    def __init__(self, name):
-        self.name = name
-        self.health = 100
-        self.attack_power = 10
-        self.level = 1
-        self.experience = 0
-        self.quests_completed = 0
-        self.inventory = []
-        self.quests = []
-
-    def attack(self, enemy):
-        damage = random.randint(1, self.attack_power)
-        enemy.health -= damage
-        return f"{self.name} attacks {enemy.name} for {damage} damage."
-
-    def special_attack(self, enemy):
-        damage = random.randint(self.attack_power, self.attack_power * 2)
-        enemy.health -= damage
-        return f"{self.name} performs a special attack on {enemy.name} for {damage} damage!"
-
-    def add_item(self, item):
-        self.inventory.append(item)
-        return f"{self.name} picks up {item.name}."
-
-    def show_inventory(self):
-        inventory_list = [f"{item.name} (x{item.quantity})" for item in self.inventory]
-        return inventory_list if inventory_list else ["No items in inventory."]
-
-    def use_item(self, item_name):
-        item = next((i for i in self.inventory if i.name == item_name), None)
-        if item:
-            effect_message = item.use(self)
-            item.quantity -= 1
-            if item.quantity <= 0:
-                self.inventory.remove(item)
-            return f"{self.name} uses {item.name}. {effect_message}"
-        return "Item not found in inventory."
-
-    def gain_experience(self, exp):
-        self.experience += exp
-        if self.experience >= self.level * 10:
-            self.level_up()
-
-    def level_up(self):
-        self.level += 1
-        self.health += 20
-        self.attack_power += 5
-        self.experience = 0
-        return f"{self.name} has leveled up to level {self.level}!"
-
-    def is_alive(self):
-        return self.health > 0
-
-    def heal(self):
-        self.health = 100
-
-    def accept_quest(self, quest):
-        self.quests.append(quest)
-        return f"{self.name} accepts quest: {quest.description}"
-
-    def complete_quest(self, quest):
-        quest.is_completed = True
-        self.quests_completed += 1
-        return f"{self.name} completed quest: {quest.description}"
-
-    def display_stats(self):
-        table = Table(title=f"{self.name}'s Stats")
-        table.add_column("Attribute", justify="right", style="cyan", no_wrap=True)
-        table.add_column("Value", style="magenta")
-        table.add_row("Health", str(self.health))
-        table.add_row("Attack Power", str(self.attack_power))
-        table.add_row("Level", str(self.level))
-        table.add_row("Experience", str(self.experience))
-        table.add_row("Quests Completed", str(self.quests_completed))
-        console.print(table)
-
-    def display_quests(self):
-        table = Table(title=f"{self.name}'s Quests")
-        table.add_column("Quest", justify="left", style="cyan", no_wrap=True)
-        table.add_column("Status", style="magenta")
-        for quest in self.quests:
-            status = "Completed" if quest.is_completed else "Incomplete"
-            table.add_row(quest.description, status)
-        console.print(table)
-
-class Quest:
-    def __init__(self, description):
-        self.description = description
-        self.is_completed = False
-
-class Enemy:
-    def __init__(self, name, health, attack_power, experience_value):
-        self.name = name
-        self.health = health
-        self.attack_power = attack_power
-        self.experience_value = experience_value
-
-    def attack(self, player):
-        damage = random.randint(1, self.attack_power)
-        player.health -= damage
-        return f"{self.name} attacks {player.name} for {damage} damage."
-
-    def special_attack(self, player):
-        damage = random.randint(self.attack_power, self.attack_power * 2)
-        player.health -= damage
-        return f"{self.name} performs a special attack on {player.name} for {damage} damage!"
-
-    def is_alive(self):
-        return self.health > 0
-
-class Item:
-    def __init__(self, name, effect, quantity=1):
-        self.name = name
-        self.effect = effect
-        self.quantity = quantity
-
-    def use(self, player):
-        if self.effect == "heal":
-            player.health += 20
-            return f"{player.name} heals 20 health."
-        elif self.effect == "boost":
-            player.attack_power += 5
-            return f"{player.name} gains 5 attack power."
-        elif self.effect == "level_up":
-            player.gain_experience(player.level * 10)
-            return f"{player.name} gains enough experience to level up!"
-        elif self.effect == "random":
-            random_effect = random.choice(["heal", "boost", "level_up"])
-            return self.use(player)
-        return "Nothing happens."
-
-class GameWorld:
-    def __init__(self, player):
-        self.player = player
-        self.enemies = [
-            Enemy("Goblin", 30, 5, 5),
-            Enemy("Orc", 50, 8, 8),
-            Enemy("Dragon", 100, 15, 20),
-            Enemy("Troll", 40, 6, 6),
-            Enemy("Vampire", 70, 10, 15),
-            Enemy("Slime", 20, 3, 3),
-            Enemy("Zombie", 60, 7, 10),
-            Enemy("Bandit", 50, 9, 8)
-        ]
-        self.items = [
-            Item("Health Potion", "heal"),
-            Item("Strength Elixir", "boost"),
-            Item("Magic Stone", "boost"),
-            Item("Healing Herb", "heal"),
-            Item("Experience Scroll", "level_up"),
-            Item("Revive Potion", "revive"),
-            Item("Energy Drink", "boost"),
-            Item("Mystery Box", "random")
-        ]
-        self.current_enemy = None
-
-    def encounter_enemy(self):
-        if self.enemies:
-            possible_enemies = [e for e in self.enemies if e.health <= (self.player.level * 20)]
-            if not possible_enemies:
-                possible_enemies = self.enemies
-            self.current_enemy = random.choice(possible_enemies)
-            return f"A wild {self.current_enemy.name} appears!"
-        return "No more enemies to fight."
-
-    def find_item(self):
-        if self.items:
-            item = random.choice(self.items)
-            self.player.add_item(item)
-            self.items.remove(item)
-            return f"{self.player.name} finds a {item.name}!"
-        return "No more items to find."
-
-    def battle(self):
-        battle_log = []
-        in_battle = True
-        while self.player.is_alive() and self.current_enemy.is_alive():
-            action = random.choice(["attack", "special_attack"])
-            if action == "attack":
-                battle_log.append(self.player.attack(self.current_enemy))
-            else:
-                battle_log.append(self.player.special_attack(self.current_enemy))
-
-            if self.current_enemy.is_alive():
-                action = random.choice(["attack", "special_attack"])
-                if action == "attack":
-                    battle_log.append(self.current_enemy.attack(self.player))
-                else:
-                    battle_log.append(self.current_enemy.special_attack(self.player))
-
-        if self.player.is_alive():
-            battle_log.append(f"{self.player.name} defeated {self.current_enemy.name}!")
-            self.player.gain_experience(self.current_enemy.experience_value)
-            level_up_message = self.player.level_up()
-            if level_up_message:
-                battle_log.append(level_up_message)
-            self.enemies.remove(self.current_enemy)
-            in_battle = False
-        else:
-            battle_log.append(f"{self.player.name} has been defeated by {self.current_enemy.name}.")
-            in_battle = False
-        return battle_log
-
-    def assign_quest(self):
-        quests = [
-            "Defeat 5 Goblins",
-            "Collect 3 Healing Herbs",
-            "Find the Magic Stone",
-            "Defeat the Dragon",
-            "Help the Villager",
-            "Find the Lost Sword"
-        ]
-        quest_description = random.choice(quests)
-        quest = Quest(quest_description)
-        self.player.accept_quest(quest)
-        return f"New quest assigned: {quest.description}"
-
-    def complete_quest(self):
-        for quest in self.player.quests:
-            if not quest.is_completed:
-                self.player.complete_quest(quest)
-                return f"Quest completed: {quest.description}"
-        return "No quests to complete."
-
-    def display_map(self):
-        map_data = np.zeros((10, 10))
-        player_pos = (random.randint(0, 9), random.randint(0, 9))
-        map_data[player_pos] = 1
-        plt.imshow(map_data, cmap="viridis")
-        plt.title(f"{self.player.name}'s Map")
-        plt.show()
+from instrumentation import timed
+from game import (
+    VICTORY, AutosaveWriter, Enemy, EnemyStore, EnemyView, GameDatabase, GameWorld,
+    Inventory, Item, Player, PlayerCache, Quest, QuestTracker, display_leaderboard, format_event, make_rng,
+)
+
+# pygame is imported by the Renderer, so the name prompt opens without it
+
+# The core classes lived in this module before game.py; they stay importable
+# from here for older scripts.
+__all__ = [
+    "LogBuffer", "PygameApp", "RPGGameApp", "Renderer",
+    "AutosaveWriter", "Enemy", "EnemyStore", "EnemyView", "GameDatabase", "GameWorld",
+    "Inventory", "Item", "Player", "PlayerCache", "Quest", "QuestTracker", "make_rng",
+]
+
+TEXT_CACHE_SIZE = 256
+BATTLE_FPS = 60
+BATTLE_STEP = 1.0 / BATTLE_FPS
+MAX_FRAME_STEPS = 5
+LOG_LINES = 500
+LOG_FLUSH_MS = 50
 
 # Pygame setup for immersive view
-class PygameApp:
-    def __init__(self, player):
+class Renderer:
+    # One window and font for the whole session. Rendered text is cached by
+    # (text, color), and only the rectangles drawn since the last present()
+    # are pushed to the display.
+    def __init__(self, size=(800, 600), cache_size=TEXT_CACHE_SIZE):
+        import pygame
         pygame.init()
-        self.player = player
-        self.screen = pygame.display.set_mode((800, 600))
+        self.screen = pygame.display.set_mode(size)
         pygame.display.set_caption("RPG Game")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont(None, 36)
+        self.background = (0, 0, 0)
+        self.text_cache = OrderedDict()
+        self.cache_size = cache_size
+        self.dirty = []
+        self.closed = False
+
+    def text_surface(self, text, color):
+        key = (text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.text_cache[key] = self.font.render(text, True, color)
+            if len(self.text_cache) > self.cache_size:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
 
     def draw_text(self, text, pos, color=(255, 255, 255)):
-        text_surface = self.font.render(text, True, color)
-        self.screen.blit(text_surface, pos)
+        rect = self.screen.blit(self.text_surface(text, color), pos)
+        self.dirty.append(rect)
+        return rect
+
+    def draw_rect(self, color, rect):
+        import pygame
+        self.dirty.append(pygame.draw.rect(self.screen, color, rect))
+
+    def clear(self, rect=None):
+        import pygame
+        rect = pygame.Rect(rect) if rect else self.screen.get_rect()
+        self.screen.fill(self.background, rect)
+        self.dirty.append(rect)
+
+    def present(self):
+        import pygame
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+    def close(self):
+        import pygame
+        if not self.closed:
+            self.closed = True
+            pygame.quit()
+
+class PygameApp:
+    MESSAGE_AREA = (300, 280, 500, 320)
+
+    def __init__(self, player, renderer=None):
+        import pygame
+        self.player = player
+        self.renderer = renderer or Renderer()
+        self.screen = self.renderer.screen
+        self.clock = self.renderer.clock
+        self.font = self.renderer.font
+        self.key_actions = {
+            pygame.K_1: self.attack,
+            pygame.K_2: self.special_attack,
+            pygame.K_3: self.show_items,
+            pygame.K_4: self.end_battle,
+        }
+        self.enemy = None
+        self.in_battle = False
+
+    def draw_text(self, text, pos, color=(255, 255, 255)):
+        self.renderer.draw_text(text, pos, color)
 
     def draw_hp_bar(self, entity, pos):
-        hp_ratio = entity.health / 100
-        pygame.draw.rect(self.screen, (255, 0, 0), (pos[0], pos[1], 100, 20))
-        pygame.draw.rect(self.screen, (0, 255, 0), (pos[0], pos[1], 100 * hp_ratio, 20))
+        hp_ratio = max(0, min(entity.health / 100, 1))
+        self.renderer.draw_rect((255, 0, 0), (pos[0], pos[1], 100, 20))
+        self.renderer.draw_rect((0, 255, 0), (pos[0], pos[1], 100 * hp_ratio, 20))
+
+    def draw_scene(self, enemy):
+        self.renderer.clear()
+        self.draw_text(f"{self.player.name}", (50, 50))
+        self.draw_text(f"{enemy.name}", (600, 50))
+        self.draw_text("1. Attack", (50, 400))
+        self.draw_text("2. Special Attack", (50, 450))
+        self.draw_text("3. Use Item", (50, 500))
+        self.draw_text("4. Run", (50, 550))
+
+    def after(self, seconds, callback):
+        self.timers.append([seconds, callback])
+
+    def show_message(self, lines, pos=(300, 400), seconds=1.0):
+        # a newer message replaces this one; its timer then clears nothing
+        self.message_id += 1
+        message_id = self.message_id
+        self.renderer.clear(self.MESSAGE_AREA)
+        for i, line in enumerate(lines):
+            self.draw_text(line, (pos[0], pos[1] + i * 50))
+        self.after(seconds, lambda: self.clear_message(message_id))
+
+    def clear_message(self, message_id):
+        if message_id == self.message_id and not self.renderer.closed:
+            self.renderer.clear(self.MESSAGE_AREA)
+
+    def start_battle(self, enemy):
+        import pygame
+        self.enemy = enemy
+        self.battle_log = []
+        self.in_battle = True
+        self.ending = False
+        self.timers = []
+        self.message_id = 0
+        self.accumulator = 0.0
+        self.shown_health = None
+        self.last_tick = pygame.time.get_ticks()
+        pygame.event.clear()
+        self.draw_scene(enemy)
+        self.renderer.present()
+
+    def end_battle(self):
+        self.in_battle = False
+        if not self.renderer.closed:
+            self.renderer.clear(self.MESSAGE_AREA)
+            self.renderer.present()
+
+    def attack(self):
+        self.strike(self.player.attack_event)
+
+    def special_attack(self):
+        self.strike(self.player.special_attack_event)
+
+    def strike(self, action):
+        event = action(self.enemy)
+        self.battle_log.append(event)
+        if self.enemy.is_alive():
+            self.show_message([format_event(event)])
+            return
+        defeated = (VICTORY, self.player.name, self.enemy.name, None)
+        self.battle_log.append(defeated)
+        self.show_message([format_event(event), format_event(defeated)])
+        # leave the result on screen for a moment, ignoring further input
+        self.ending = True
+        self.after(1.0, self.end_battle)
+
+    def show_items(self):
+        inventory = self.player.show_inventory()
+        self.show_message([f"{i+1}. {item}" for i, item in enumerate(inventory)], (300, 300), 2.0)
+
+    def handle_events(self):
+        import pygame
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.renderer.close()
+                self.in_battle = False
+                return
+            # one action per key press, a held key does not repeat
+            if event.type == pygame.KEYDOWN and not self.ending:
+                action = self.key_actions.get(event.key)
+                if action:
+                    action()
+                    if not self.in_battle:
+                        return
+
+    def update(self, step):
+        for timer in list(self.timers):
+            timer[0] -= step
+            if timer[0] <= 0:
+                self.timers.remove(timer)
+                timer[1]()
+
+    @timed("frame_seconds")
+    def frame(self):
+        # Runs one frame: input first, then fixed timesteps for the elapsed
+        # time, then the redraw. Returns False once the battle is over.
+        import pygame
+        if not self.in_battle:
+            return False
+        self.handle_events()
+        now = pygame.time.get_ticks()
+        self.accumulator += min((now - self.last_tick) / 1000, MAX_FRAME_STEPS * BATTLE_STEP)
+        self.last_tick = now
+        while self.in_battle and self.accumulator >= BATTLE_STEP:
+            self.update(BATTLE_STEP)
+            self.accumulator -= BATTLE_STEP
+        if self.renderer.closed:
+            return False
+        if self.shown_health != (self.player.health, self.enemy.health):
+            self.shown_health = (self.player.health, self.enemy.health)
+            self.draw_hp_bar(self.player, (50, 100))
+            self.draw_hp_bar(self.enemy, (600, 100))
+        self.renderer.present()
+        return self.in_battle
 
     def battle_view(self, enemy):
-        in_battle = True
-        while in_battle:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    quit()
-
-            self.screen.fill((0, 0, 0))
-            self.draw_text(f"{self.player.name}", (50, 50))
-            self.draw_hp_bar(self.player, (50, 100))
-            self.draw_text(f"{enemy.name}", (600, 50))
-            self.draw_hp_bar(enemy, (600, 100))
-
-            self.draw_text("1. Attack", (50, 400))
-            self.draw_text("2. Special Attack", (50, 450))
-            self.draw_text("3. Use Item", (50, 500))
-            self.draw_text("4. Run", (50, 550))
-
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_1]:
-                result = self.player.attack(enemy)
-                self.draw_text(result, (300, 400))
-                pygame.display.update()
-                pygame.time.wait(1000)
-                if not enemy.is_alive():
-                    result = f"{enemy.name} has been defeated!"
-                    self.draw_text(result, (300, 450))
-                    pygame.display.update()
-                    pygame.time.wait(1000)
-                    in_battle = False
-
-            if keys[pygame.K_2]:
-                result = self.player.special_attack(enemy)
-                self.draw_text(result, (300, 400))
-                pygame.display.update()
-                pygame.time.wait(1000)
-                if not enemy.is_alive():
-                    result = f"{enemy.name} has been defeated!"
-                    self.draw_text(result, (300, 450))
-                    pygame.display.update()
-                    pygame.time.wait(1000)
-                    in_battle = False
-
-            if keys[pygame.K_3]:
-                inventory = self.player.show_inventory()
-                for i, item in enumerate(inventory):
-                    self.draw_text(f"{i+1}. {item}", (300, 300 + i * 50))
-                pygame.display.update()
-                pygame.time.wait(2000)
-
-            if keys[pygame.K_4]:
-                in_battle = False
-
-            pygame.display.update()
-            self.clock.tick(60)
-
-        pygame.quit()
+        # Standalone loop; RPGGameApp drives frame() from the Tk event loop
+        self.start_battle(enemy)
+        while self.frame():
+            self.clock.tick(BATTLE_FPS)
+        return self.battle_log
+
+class LogBuffer:
+    # Bounded game log for a tk.Text. Lines queue in a ring buffer and go into
+    # the widget in one insert per flush; the widget keeps the newest
+    # max_lines lines.
+    def __init__(self, root, text, max_lines=LOG_LINES, delay=LOG_FLUSH_MS):
+        self.root = root
+        self.text = text
+        self.max_lines = max_lines
+        self.delay = delay
+        self.pending = deque(maxlen=max_lines)
+        self.scheduled = False
+
+    def write(self, line):
+        self.pending.append(line)
+        if not self.scheduled:
+            self.scheduled = True
+            self.root.after(self.delay, self.flush)
+
+    def extend(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        self.scheduled = False
+        if not self.pending:
+            return
+        self.text.insert(tk.END, "\n".join(self.pending) + "\n")
+        self.pending.clear()
+        # the text always ends with an empty line after the last newline
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+        self.text.see(tk.END)
 
 class RPGGameApp:
     def __init__(self, root):
         self.root = root
         self.root.title("RPG Game")
         self.db = GameDatabase()
+        self.autosave = AutosaveWriter(self.db.db_name)
+        self.renderer = None
+        self.battle = None
+        self.map_shown = False
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
 
         self.style = ttk.Style()
         self.style.theme_use('clam')
@@ -420,14 +290,21 @@ class RPGGameApp:
         self.game_frame = ttk.Frame(root)
         self.game_frame.pack(pady=20)
 
+    @timed("action_seconds", action="start_game")
     def start_game(self):
         player_name = self.player_name_entry.get()
+        if player_name and self.db.player_exists(player_name):
+            # saving a fresh Player under this name would overwrite the old save
+            if messagebox.askyesno("Character exists", f"{player_name} already has a saved game. Load it?"):
+                self.load_game()
+            return
         if player_name:
             self.player = Player(player_name)
             self.world = GameWorld(self.player)
             self.db.save_player(self.player)
             self.setup_game_ui()
 
+    @timed("action_seconds", action="load_game")
     def load_game(self):
         player_name = self.player_name_entry.get()
         player = self.db.load_player(player_name)
@@ -466,72 +343,136 @@ class RPGGameApp:
         self.stats_button.pack(side=tk.LEFT, padx=5)
         self.map_button = ttk.Button(self.action_frame, text="Show Map", command=self.show_map)
         self.map_button.pack(side=tk.LEFT, padx=5)
+        self.leaderboard_button = ttk.Button(self.action_frame, text="Leaderboard", command=self.show_leaderboard)
+        self.leaderboard_button.pack(side=tk.LEFT, padx=5)
 
         self.output_text = tk.Text(self.game_frame, height=20, width=80)
         self.output_text.pack()
+        self.log = LogBuffer(self.root, self.output_text)
+
+        # arrow keys walk the tile world
+        self.root.bind("<Up>", lambda event: self.move(0, -1))
+        self.root.bind("<Down>", lambda event: self.move(0, 1))
+        self.root.bind("<Left>", lambda event: self.move(-1, 0))
+        self.root.bind("<Right>", lambda event: self.move(1, 0))
 
+    @timed("action_seconds", action="explore")
     def explore(self):
-        action = random.choice(["encounter", "item"])
+        if self.battle:
+            return
+        action = self.world.rng.choice(["encounter", "item"])
         if action == "encounter":
             encounter_message = self.world.encounter_enemy()
-            self.output_text.insert(tk.END, encounter_message + "\n")
-            if self.world.current_enemy:
-                pygame_app = PygameApp(self.player)
-                battle_log = pygame_app.battle_view(self.world.current_enemy)
-                for log in battle_log:
-                    self.output_text.insert(tk.END, log + "\n")
+            self.log.write(encounter_message)
+            if self.world.current_enemy and self.world.current_enemy.is_alive():
+                self.start_battle()
         elif action == "item":
             item_message = self.world.find_item()
-            self.output_text.insert(tk.END, item_message + "\n")
+            self.log.write(item_message)
 
         self.update_status()
 
+    @timed("action_seconds", action="move")
+    def move(self, dx, dy):
+        if self.battle:
+            return "break"
+        self.log.write(self.world.move_player(dx, dy))
+        if self.world.current_enemy:
+            self.start_battle()
+        if self.map_shown:
+            self.world.display_map()
+        self.update_status()
+        return "break"
+
+    def start_battle(self):
+        if self.renderer is None or self.renderer.closed:
+            self.renderer = Renderer()
+        self.battle = PygameApp(self.player, self.renderer)
+        self.battle.start_battle(self.world.current_enemy)
+        self.root.after(int(BATTLE_STEP * 1000), self.battle_frame)
+
+    def battle_frame(self):
+        # The battle runs one frame per Tk timer tick so both windows stay live
+        if self.battle.frame():
+            self.root.after(int(BATTLE_STEP * 1000), self.battle_frame)
+            return
+        battle_log = self.battle.battle_log
+        self.battle = None
+        if self.player.is_alive() and not self.world.current_enemy.is_alive():
+            battle_log.extend(self.world.claim_victory())
+        self.log.extend(format_event(event) for event in battle_log)
+        self.update_status()
+
+    @timed("action_seconds", action="show_inventory")
     def show_inventory(self):
         inventory = self.player.show_inventory()
-        self.output_text.insert(tk.END, f"{self.player.name}'s Inventory:\n")
-        for item in inventory:
-            self.output_text.insert(tk.END, f"- {item}\n")
+        self.log.write(f"{self.player.name}'s Inventory:")
+        self.log.extend(f"- {item}" for item in inventory)
 
+    @timed("action_seconds", action="use_item")
     def use_item(self):
         if self.player.inventory:
-            item_name = self.player.inventory[0].name  # Just use the first item for simplicity
-            use_item_message = self.player.use_item(item_name)
-            self.output_text.insert(tk.END, use_item_message + "\n")
+            item_name = self.player.inventory.first().name  # Just use the first item for simplicity
+            use_item_message = self.player.use_item(item_name, self.world.rng)
+            self.log.write(use_item_message)
         else:
-            self.output_text.insert(tk.END, "No items in inventory.\n")
+            self.log.write("No items in inventory.")
 
         self.update_status()
 
+    @timed("action_seconds", action="heal")
     def heal(self):
         if self.world.current_enemy and self.world.current_enemy.is_alive():
-            self.output_text.insert(tk.END, "Cannot heal during battle.\n")
+            self.log.write("Cannot heal during battle.")
         else:
             self.player.heal()
             self.update_status()
-            self.output_text.insert(tk.END, f"{self.player.name} has been fully healed.\n")
+            self.log.write(f"{self.player.name} has been fully healed.")
 
+    @timed("action_seconds", action="assign_quest")
     def assign_quest(self):
         quest_message = self.world.assign_quest()
-        self.output_text.insert(tk.END, quest_message + "\n")
+        self.log.write(quest_message)
+        self.autosave.submit(self.player)
 
+    @timed("action_seconds", action="complete_quest")
     def complete_quest(self):
         complete_message = self.world.complete_quest()
-        self.output_text.insert(tk.END, complete_message + "\n")
+        self.log.write(complete_message)
+        self.autosave.submit(self.player)
 
+    @timed("action_seconds", action="show_stats")
     def show_stats(self):
         self.player.display_stats()
 
+    @timed("action_seconds", action="show_map")
     def show_map(self):
+        self.map_shown = True
         self.world.display_map()
 
+    @timed("action_seconds", action="show_leaderboard")
+    def show_leaderboard(self):
+        # no flush: the player's own row may lag by one autosave interval,
+        # which beats blocking the event loop on the writer
+        display_leaderboard(self.db, pages=1)
+
+    @timed("action_seconds", action="update_status")
     def update_status(self):
         self.status_label.config(text=f"Player: {self.player.name} | Health: {self.player.health} | Attack Power: {self.player.attack_power} | Level: {self.player.level}")
+        self.autosave.submit(self.player)
         if not self.player.is_alive():
             messagebox.showinfo("Game Over", "You have been defeated.")
             self.root.quit()
 
+    def quit(self):
+        self.autosave.close()
+        if self.renderer:
+            self.renderer.close()
+        self.root.destroy()
+
 # Main application
 if __name__ == "__main__":
     root = tk.Tk()
     app = RPGGameApp(root)
     root.mainloop()
+    app.autosave.close()
@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from game import LEADERBOARD_PAGE_SIZE, LEADERBOARDS, PLAYER_FIELDS, AutosaveWriter, GameDatabase, GameWorld, Player
+from headless import explore
+from instrumentation import metrics
+
+# Headless multi-session server. Every connection is one session with its own
+# GameWorld, speaking JSON lines: {"action": "explore"} in, {"ok": true,
+# "log": [...]} out. Game logic runs on the event loop; database reads go
+# through one reader thread, and the changes from every session go through one
+# AutosaveWriter, which merges them into shared transactions.
+
+HOST = "127.0.0.1"
+PORT = 8765
+SERVER_INTERVAL = 0.5
+LISTEN_BACKLOG = 4096
+MAX_PAGE_SIZE = 100
+LEAVE_FLUSH_TIMEOUT = 10.0
+LOAD_ACTIONS = ("explore", "explore", "explore", "use_item", "assign_quest", "complete_quest", "stats")
+
+
+class SessionError(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, server):
+        self.server = server
+        self.world = None
+        self.finished = False
+        self.actions = {
+            "join": self.join,
+            "explore": self.explore,
+            "battle": self.battle,
+            "use_item": self.use_item,
+            "assign_quest": self.assign_quest,
+            "complete_quest": self.complete_quest,
+            "stats": self.stats,
+            "leaderboard": self.leaderboard,
+            "metrics": self.metrics,
+            "leave": self.leave,
+        }
+
+    @property
+    def player(self):
+        return self.world.player
+
+    async def respond(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "invalid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "requests must be JSON objects"}
+        try:
+            action = request.get("action")
+            action = self.actions.get(action) if isinstance(action, str) else None
+            if action is None:
+                raise SessionError(f"unknown action {request.get('action')!r}")
+            if self.world is None and action not in (self.join, self.leave, self.leaderboard, self.metrics):
+                raise SessionError("join first")
+            if self.world and action not in (self.stats, self.leaderboard, self.metrics, self.leave) and not self.player.is_alive():
+                raise SessionError(f"{self.player.name} has been defeated")
+            start = time.perf_counter()
+            response = await action(request)
+            if metrics.enabled:
+                metrics.observe("action_seconds", time.perf_counter() - start, action=request["action"])
+            response["ok"] = True
+            if self.world:
+                self.server.writer.submit(self.player)
+                response["alive"] = self.player.is_alive()
+        except SessionError as error:
+            response = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # a bad request must not take the whole server down with it
+            print(f"error handling {line!r}: {error!r}", file=sys.stderr)
+            response = {"ok": False, "error": f"internal error: {type(error).__name__}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def join(self, request):
+        name = request.get("name")
+        if not name or not isinstance(name, str):
+            raise SessionError("a player name is required")
+        if self.world:
+            raise SessionError("already joined")
+        seed = request.get("seed")
+        if seed is not None and not isinstance(seed, int):
+            raise SessionError("seed must be an integer")
+        if name in self.server.sessions:
+            raise SessionError(f"{name} is already playing")
+        self.server.sessions[name] = self
+        try:
+            loop = asyncio.get_running_loop()
+            player = await loop.run_in_executor(self.server.reader, self.server.fetch_player, name)
+        except BaseException:
+            del self.server.sessions[name]
+            raise
+        if player is None:
+            player = Player(name)
+            player.mark_all_changed()
+        self.world = GameWorld(player, seed)
+        return {"log": [f"Welcome, {name}!"]}
+
+    async def explore(self, request):
+        log = explore(self.world, fight=False)
+        enemy = self.world.current_enemy
+        return {"log": log, "enemy": enemy.name if enemy and enemy.is_alive() else None}
+
+    async def battle(self, request):
+        enemy = self.world.current_enemy
+        if not enemy or not enemy.is_alive():
+            raise SessionError("There is no enemy to fight.")
+        return {"log": self.world.battle()}
+
+    async def use_item(self, request):
+        if not self.player.inventory:
+            return {"log": ["No items in inventory."]}
+        name = request.get("item") or self.player.inventory.first().name
+        if not isinstance(name, str):
+            raise SessionError("item must be a string")
+        return {"log": [self.player.use_item(name, self.world.rng)]}
+
+    async def assign_quest(self, request):
+        return {"log": [self.world.assign_quest()]}
+
+    async def complete_quest(self, request):
+        return {"log": [self.world.complete_quest()]}
+
+    async def stats(self, request):
+        stats = {field: getattr(self.player, field) for field in PLAYER_FIELDS}
+        stats["name"] = self.player.name
+        stats["inventory"] = {item.name: item.quantity for item in self.player.inventory}
+        stats["quests"] = [(quest.description, quest.is_completed) for quest in self.player.quests]
+        return {"stats": stats}
+
+    async def leaderboard(self, request):
+        # {"board": "level", "limit": 20, "after": <cursor from the last page>}
+        board = request.get("board", "level")
+        if not isinstance(board, str) or board not in LEADERBOARDS:
+            raise SessionError(f"unknown leaderboard {board!r}")
+        limit = request.get("limit", LEADERBOARD_PAGE_SIZE)
+        if not isinstance(limit, int) or not 0 < limit <= MAX_PAGE_SIZE:
+            raise SessionError(f"limit must be an integer from 1 to {MAX_PAGE_SIZE}")
+        after = request.get("after")
+        if after is not None and (not isinstance(after, list) or len(after) != len(LEADERBOARDS[board]) + 2
+                                  or not all(isinstance(key, int) and not isinstance(key, bool) for key in after)):
+            raise SessionError("after must be the cursor returned with the previous page")
+        loop = asyncio.get_running_loop()
+        rows, after = await loop.run_in_executor(
+            self.server.reader, self.server.fetch_leaderboard, board, limit, after)
+        return {"rows": rows, "after": after}
+
+    async def metrics(self, request):
+        # server-wide metrics; empty unless RPG_METRICS is set
+        if request.get("format") == "prometheus":
+            return {"metrics": metrics.to_prometheus()}
+        return {"metrics": metrics.to_json()}
+
+    async def leave(self, request=None):
+        # Waits for this player's last changes to be written, so a rejoin
+        # (here or in another process) reads them back
+        self.finished = True
+        if self.world is None:
+            return {"log": []}
+        player = self.player
+        self.world = None
+        self.server.writer.submit(player)
+        try:
+            # the name stays taken until the write lands, so a reconnect
+            # cannot read the row before it is committed
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.server.writer.flush, LEAVE_FLUSH_TIMEOUT)
+        finally:
+            del self.server.sessions[player.name]
+        return {"log": [f"Goodbye, {player.name}."]}
+
+
+class GameServer:
+    def __init__(self, db_name="rpg_game.db", interval=SERVER_INTERVAL):
+        self.db_name = db_name
+        self.writer = AutosaveWriter(db_name, interval)
+        self.reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-reader")
+        self.db = None
+        self.sessions = {}
+
+    def reader_db(self):
+        # only ever called on the reader thread, which owns this connection
+        if self.db is None:
+            self.db = GameDatabase(self.db_name)
+        return self.db
+
+    def fetch_player(self, name):
+        return self.reader_db().load_player(name)
+
+    def fetch_leaderboard(self, board, limit, after):
+        return self.reader_db().leaderboard(board, limit, after)
+
+    async def handle_connection(self, reader, writer):
+        session = Session(self)
+        try:
+            while not session.finished:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await session.respond(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                await session.leave()
+            except Exception as error:
+                print(f"error saving on disconnect: {error!r}", file=sys.stderr)
+            finally:
+                writer.close()
+
+    async def serve_stdio(self):
+        # One session over stdin/stdout
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        session = Session(self)
+        while not session.finished:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                print(json.dumps(await session.respond(line)), flush=True)
+        await session.leave()
+
+    async def serve(self, host=HOST, port=PORT, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path, backlog=LISTEN_BACKLOG)
+            print(f"listening on {unix_path}", flush=True)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, backlog=LISTEN_BACKLOG)
+            print(f"listening on {host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.writer.close()
+        self.reader.shutdown()
+
+
+def raise_file_limit():
+    # thousands of sockets need more than the usual 1024 descriptors
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def run_server(db_name, host=HOST, port=PORT, unix_path=None, interval=SERVER_INTERVAL):
+    raise_file_limit()
+    server = GameServer(db_name, interval)
+    try:
+        asyncio.run(server.serve(host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+async def load_client(index, host, port, actions, seed, latencies):
+    rng = random.Random(seed * 1_000_003 + index)
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def call(request):
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        return response
+
+    await call({"action": "join", "name": f"load-{seed}-{index}", "seed": seed * 1_000_003 + index})
+    for _ in range(actions):
+        response = await call({"action": rng.choice(LOAD_ACTIONS)})
+        if response.get("enemy"):
+            response = await call({"action": "battle"})
+        if not response.get("alive", True):
+            break
+    await call({"action": "leave"})
+    writer.close()
+    await writer.wait_closed()
+
+
+async def wait_for_server(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            await writer.wait_closed()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run_load(host, port, clients, actions, seed):
+    latencies = []
+    await wait_for_server(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(load_client(i, host, port, actions, seed, latencies) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "actions_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def load_test(clients=2000, actions=20, seed=0, host=HOST, port=PORT, spawn=True):
+    # Starts a server in a child process on a scratch database unless
+    # spawn=False, then drives it with `clients` concurrent connections
+    raise_file_limit()
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        if spawn:
+            db_name = os.path.join(directory, "load.db")
+            server = multiprocessing.Process(target=run_server, args=(db_name, host, port), daemon=True)
+            server.start()
+        try:
+            return asyncio.run(run_load(host, port, clients, actions, seed))
+        finally:
+            if server:
+                server.terminate()
+                server.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the game to many sessions over JSON lines.")
+    parser.add_argument("--db", default="rpg_game.db")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="listen on a unix socket instead of TCP")
+    parser.add_argument("--stdio", action="store_true", help="serve one session on stdin/stdout")
+    parser.add_argument("--interval", type=float, default=SERVER_INTERVAL)
+    parser.add_argument("--load", type=int, metavar="CLIENTS", help="run the load generator with this many clients")
+    parser.add_argument("--actions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-spawn", action="store_true", help="load-test an already running server")
+    args = parser.parse_args()
+
+    if args.load:
+        result = load_test(args.load, args.actions, args.seed, args.host, args.port, not args.no_spawn)
+        print(f"{result['clients']} clients, {result['requests']} requests in {result['seconds']:.2f}s: "
+              f"{result['actions_per_s']:,.0f} actions/s, p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    elif args.stdio:
+        server = GameServer(args.db, args.interval)
+        try:
+            asyncio.run(server.serve_stdio())
+        finally:
+            server.close()
+    else:
+        run_server(args.db, args.host, args.port, args.unix, args.interval)
@@ -0,0 +1,143 @@
+import random
+import numpy as np
+from game import ATTACK, SPECIAL_ATTACK, Player, Enemy, EnemyStore, GameWorld
+
+# Headless batch engine for balancing. Runs many battles at once with the
+# same rules as GameWorld.battle: each round the player picks attack or
+# special_attack with equal odds, and the enemy strikes back if it survived.
+
+CHUNK_SIZE = 1 << 20
+HIT_EVENTS = (ATTACK, SPECIAL_ATTACK)
+
+
+class BattleStats:
+    def __init__(self, wins, turns, player_health, enemy_health):
+        self.wins = wins
+        self.turns = turns
+        self.player_health = player_health
+        self.enemy_health = enemy_health
+
+    @property
+    def battles(self):
+        return len(self.wins)
+
+    @property
+    def win_rate(self):
+        return float(self.wins.mean()) if self.battles else 0.0
+
+    def turn_distribution(self):
+        return np.bincount(self.turns)
+
+    def player_health_histogram(self, bins=20):
+        return np.histogram(self.player_health[self.wins], bins=bins)
+
+    def enemy_health_histogram(self, bins=20):
+        return np.histogram(self.enemy_health[~self.wins], bins=bins)
+
+    def summary(self):
+        return {
+            "battles": self.battles,
+            "win_rate": self.win_rate,
+            "mean_turns": float(self.turns.mean()) if self.battles else 0.0,
+            "max_turns": int(self.turns.max()) if self.battles else 0,
+        }
+
+
+def _damage(rng, attack_power, count):
+    # attack rolls 1..ap, special_attack rolls ap..2ap; pick one per battle
+    special = rng.random(count) < 0.5
+    low = np.where(special, attack_power, 1)
+    span = np.where(special, attack_power + 1, attack_power)
+    return low + (rng.random(count) * span).astype(np.int32)
+
+
+def _simulate_chunk(rng, player_health, player_attack, enemy_health, enemy_attack, count, max_turns):
+    p_hp = np.full(count, player_health, dtype=np.int32)
+    e_hp = np.full(count, enemy_health, dtype=np.int32)
+    turns = np.zeros(count, dtype=np.int32)
+    active = np.arange(count)
+    for _ in range(max_turns):
+        if not active.size:
+            break
+        turns[active] += 1
+        e_hp[active] -= _damage(rng, player_attack, active.size)
+        survivors = active[e_hp[active] > 0]
+        p_hp[survivors] -= _damage(rng, enemy_attack, survivors.size)
+        active = survivors[p_hp[survivors] > 0]
+    wins = e_hp <= 0
+    return wins, turns, p_hp, e_hp
+
+
+def simulate_battles(player, enemy, battles, seed=None, rng=None, max_turns=10000):
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    chunks = []
+    remaining = battles
+    while remaining > 0:
+        count = min(remaining, CHUNK_SIZE)
+        chunks.append(_simulate_chunk(
+            rng, player.health, player.attack_power,
+            enemy.health, enemy.attack_power, count, max_turns,
+        ))
+        remaining -= count
+    if not chunks:
+        empty = np.zeros(0, dtype=np.int32)
+        return BattleStats(empty.astype(bool), empty, empty, empty)
+    return BattleStats(*(np.concatenate(column) for column in zip(*chunks)))
+
+
+def win_rate_z_score(a, b):
+    # two-proportion z test; |z| < 3 means the engines agree on win rate
+    pooled = (a.wins.sum() + b.wins.sum()) / (a.battles + b.battles)
+    error = np.sqrt(pooled * (1 - pooled) * (1 / a.battles + 1 / b.battles))
+    return float((a.win_rate - b.win_rate) / error) if error else 0.0
+
+
+def _copy_player(player):
+    copy = Player(player.name)
+    copy.health = player.health
+    copy.attack_power = player.attack_power
+    copy.level = player.level
+    return copy
+
+
+def scalar_battles(player, enemy, battles, seed=None):
+    # Reference implementation: runs GameWorld.battle once per fight so the
+    # batch engine can be checked against it.
+    rng = random.Random(seed)
+    wins = np.zeros(battles, dtype=bool)
+    turns = np.zeros(battles, dtype=np.int32)
+    p_hp = np.zeros(battles, dtype=np.int32)
+    e_hp = np.zeros(battles, dtype=np.int32)
+    for i in range(battles):
+        fighter = _copy_player(player)
+        world = GameWorld(fighter, rng)
+        world.enemies = EnemyStore([enemy])
+        world.current_enemy = world.enemies[0]
+        # every round is a player hit plus an enemy hit unless the enemy fell,
+        # so k rounds give 2k - 1 or 2k hits; nothing is formatted
+        hits = sum(1 for event in world.iter_battle() if event[0] in HIT_EVENTS)
+        turns[i] = (hits + 1) // 2
+        wins[i] = not world.current_enemy.is_alive()
+        # battle() levels the winner up afterwards, undo the health bonus here
+        p_hp[i] = fighter.health - 20 * (fighter.level - player.level)
+        e_hp[i] = world.current_enemy.health
+    return BattleStats(wins, turns, p_hp, e_hp)
+
+
+if __name__ == "__main__":
+    import time
+
+    hero = Player("Hero")
+    orc = Enemy("Orc", 50, 8, 8)
+
+    start = time.perf_counter()
+    fast = simulate_battles(hero, orc, 2_000_000, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"batch:  {fast.summary()} ({fast.battles / elapsed:,.0f} battles/s)")
+
+    start = time.perf_counter()
+    slow = scalar_battles(hero, orc, 20_000, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"scalar: {slow.summary()} ({slow.battles / elapsed:,.0f} battles/s)")
+    print(f"win rate z-score: {win_rate_z_score(fast, slow):.2f}")
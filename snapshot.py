@@ -0,0 +1,245 @@
+import mmap
+import os
+import struct
+import tempfile
+import numpy as np
+from game import Player, Quest, Item, EnemyStore, EnemyView, GameWorld
+
+# Binary quick-save format for a whole GameWorld.
+#
+# Layout (little endian): a fixed header with the offset and count of every
+# section, then fixed-size records for the player, inventory, quests,
+# remaining enemies and remaining items, then a string table. Records refer
+# to strings by index, so any record can be read straight from the mapped
+# file with struct.unpack_from without touching the rest.
+
+MAGIC = b"RPGS"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHH11Ii")
+PLAYER = struct.Struct("<Iiiiii")
+STACK = struct.Struct("<IIi")
+QUEST = struct.Struct("<IB3xi")
+QUEST_V1 = struct.Struct("<IB3x")
+ENEMY = np.dtype([("name", "<u4"), ("health", "<i4"), ("attack_power", "<i4"), ("experience_value", "<i4")])
+STRING = struct.Struct("<II")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, text):
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.strings)
+            self.strings.append(text.encode("utf-8"))
+        return sid
+
+    def pack(self):
+        index = bytearray()
+        offset = 0
+        for data in self.strings:
+            index += STRING.pack(offset, len(data))
+            offset += len(data)
+        return bytes(index) + b"".join(self.strings)
+
+
+def pack_world(world):
+    strings = StringTable()
+    player = world.player
+    player_data = PLAYER.pack(
+        strings.intern(player.name), player.health, player.attack_power,
+        player.level, player.experience, player.quests_completed,
+    )
+    inventory_data = b"".join(
+        STACK.pack(strings.intern(item.name), strings.intern(item.effect), item.quantity)
+        for item in player.inventory
+    )
+    quest_data = b"".join(
+        QUEST.pack(strings.intern(quest.description), bool(quest.is_completed), quest.progress)
+        for quest in player.quests
+    )
+    # enemies are written column by column straight from the EnemyStore
+    enemies = world.enemies
+    name_sids = np.array([strings.intern(name) for name in enemies.names], dtype=np.uint32)
+    records = np.zeros(len(enemies), dtype=ENEMY)
+    records["name"] = name_sids[enemies.column("name_id")]
+    for column in ("health", "attack_power", "experience_value"):
+        records[column] = enemies.column(column)
+    enemy_data = records.tobytes()
+    item_data = b"".join(
+        STACK.pack(strings.intern(item.name), strings.intern(item.effect), item.quantity)
+        for item in world.items
+    )
+    current = -1
+    if isinstance(world.current_enemy, EnemyView) and world.current_enemy.store is enemies:
+        current = int(enemies.row(world.current_enemy.id))
+
+    sections = [player_data, inventory_data, quest_data, enemy_data, item_data, strings.pack()]
+    offsets = []
+    offset = HEADER.size
+    for data in sections:
+        offsets.append(offset)
+        offset += len(data)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0,
+        offsets[0],
+        offsets[1], len(player.inventory),
+        offsets[2], len(player.quests),
+        offsets[3], len(enemies),
+        offsets[4], len(world.items),
+        offsets[5], len(strings.strings),
+        current,
+    )
+    return header + b"".join(sections)
+
+
+def write_snapshot(world, path):
+    # Write to a temp file in the same directory and rename it over the
+    # target, so readers only ever see a complete snapshot
+    data = pack_world(world)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(data)
+
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            # mmap refuses empty files, so check the size before mapping
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise SnapshotError(f"{path} is too short to be a snapshot")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _flags,
+         self.player_offset,
+         self.inventory_offset, self.inventory_count,
+         self.quests_offset, self.quests_count,
+         self.enemies_offset, self.enemies_count,
+         self.items_offset, self.items_count,
+         self.strings_offset, self.strings_count,
+         self.current_enemy) = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"{path} is not a snapshot")
+        if version not in (1, VERSION):
+            self.close()
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        # version 1 files have no quest progress
+        self.quest_layout = QUEST if version == VERSION else QUEST_V1
+        self.blob_offset = self.strings_offset + self.strings_count * STRING.size
+        self.decoded = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def string(self, sid):
+        if self.decoded is not None:
+            return self.decoded[sid]
+        offset, length = STRING.unpack_from(self.data, self.strings_offset + sid * STRING.size)
+        start = self.blob_offset + offset
+        return self.data[start:start + length].decode("utf-8")
+
+    def decode_strings(self):
+        # Full loads touch most strings, so decode the whole table once
+        if self.decoded is None:
+            blob = self.data[self.blob_offset:]
+            self.decoded = [
+                blob[offset:offset + length].decode("utf-8")
+                for offset, length in self.records(STRING, self.strings_offset, self.strings_count)
+            ]
+        return self.decoded
+
+    def records(self, layout, offset, count):
+        return layout.iter_unpack(self.data[offset:offset + count * layout.size])
+
+    def player_stats(self):
+        name, health, attack_power, level, experience, quests_completed = PLAYER.unpack_from(
+            self.data, self.player_offset
+        )
+        return {
+            "name": self.string(name),
+            "health": health,
+            "attack_power": attack_power,
+            "level": level,
+            "experience": experience,
+            "quests_completed": quests_completed,
+        }
+
+    def enemy_records(self):
+        return np.frombuffer(self.data[self.enemies_offset:self.enemies_offset + self.enemies_count * ENEMY.itemsize], dtype=ENEMY)
+
+    def load_player(self):
+        self.decode_strings()
+        stats = self.player_stats()
+        player = Player(stats.pop("name"))
+        for field, value in stats.items():
+            setattr(player, field, value)
+        for name, effect, quantity in self.records(STACK, self.inventory_offset, self.inventory_count):
+            player.add_item(Item(self.string(name), self.string(effect), quantity))
+        for record in self.records(self.quest_layout, self.quests_offset, self.quests_count):
+            quest = Quest(self.string(record[0]))
+            quest.is_completed = bool(record[1])
+            quest.progress = record[2] if len(record) > 2 else 0
+            player.accept_quest(quest)
+        player.clear_changes()
+        return player
+
+    def load_world(self, rng=None):
+        self.decode_strings()
+        world = GameWorld(self.load_player(), rng)
+        records = self.enemy_records()
+        world.enemies = EnemyStore(capacity=max(len(records), 1))
+        names = self.decode_strings()
+        world.enemies.extend(
+            [names[sid] for sid in records["name"]],
+            records["health"], records["attack_power"], records["experience_value"],
+        )
+        world.items = [
+            Item(self.string(name), self.string(effect), quantity)
+            for name, effect, quantity in self.records(STACK, self.items_offset, self.items_count)
+        ]
+        if self.current_enemy >= 0:
+            world.current_enemy = world.enemies[self.current_enemy]
+        return world
+
+
+def load_snapshot(path, rng=None):
+    with Snapshot(path) as snapshot:
+        return snapshot.load_world(rng)
+
+
+def snapshot_from_database(db, player_name, path, rng=None):
+    # The database only holds the player, so the world starts fresh
+    player = db.load_player(player_name)
+    if player is None:
+        raise SnapshotError(f"player {player_name!r} not found")
+    world = GameWorld(player, rng)
+    write_snapshot(world, path)
+    return world
+
+
+def snapshot_to_database(path, db):
+    world = load_snapshot(path)
+    db.save_player(world.player)
+    return world.player
@@ -0,0 +1,89 @@
+from functools import lru_cache
+import numpy as np
+
+# Exact battle outcomes for the rules in GameWorld.battle. A state is
+# (player health, enemy health) with the player about to act; every hit does
+# at least 1 damage, so the tables fill in order of increasing health.
+
+TABLE_STEP = 64
+
+
+def damage_distribution(attack_power):
+    # attack rolls 1..ap, special_attack rolls ap..2ap, each picked half the time
+    pmf = np.zeros(2 * attack_power + 1)
+    pmf[1:attack_power + 1] += 0.5 / attack_power
+    pmf[attack_power:2 * attack_power + 1] += 0.5 / (attack_power + 1)
+    return pmf
+
+
+def _round_up(value):
+    return -(-value // TABLE_STEP) * TABLE_STEP
+
+
+def _solve(max_player_health, player_attack, max_enemy_health, enemy_attack):
+    player_pmf = damage_distribution(player_attack)
+    enemy_pmf = damage_distribution(enemy_attack)
+    # chance the player's hit finishes an enemy with e health left
+    tail = np.cumsum(player_pmf[::-1])[::-1]
+    kill = np.zeros(max_enemy_health + 1)
+    reach = min(len(tail), max_enemy_health + 1)
+    kill[:reach] = tail[:reach]
+
+    size = (max_player_health + 1, max_enemy_health + 1)
+    win = np.zeros(size)      # P(win) with the player to act
+    turns = np.zeros(size)    # expected rounds left with the player to act
+    win_after = np.zeros(size)    # same, with the enemy about to strike back
+    turns_after = np.zeros(size)
+    for e in range(1, max_enemy_health + 1):
+        hits = np.arange(1, min(e - 1, len(player_pmf) - 1) + 1)
+        weights = player_pmf[hits]
+        win[1:, e] = kill[e] + win_after[1:, e - hits] @ weights
+        turns[1:, e] = 1.0 + turns_after[1:, e - hits] @ weights
+        # the enemy strikes back; states at or below 0 player health are losses
+        win_after[:, e] = np.convolve(win[:, e], enemy_pmf)[:size[0]]
+        turns_after[:, e] = np.convolve(turns[:, e], enemy_pmf)[:size[0]]
+    win.setflags(write=False)
+    turns.setflags(write=False)
+    return win, turns
+
+
+@lru_cache(maxsize=32)
+def outcome_table(max_player_health, player_attack, max_enemy_health, enemy_attack):
+    return _solve(max_player_health, player_attack, max_enemy_health, enemy_attack)
+
+
+@lru_cache(maxsize=4096)
+def battle_outcome(player_health, player_attack, enemy_health, enemy_attack):
+    if player_health <= 0:
+        return 0.0, 0.0
+    if enemy_health <= 0:
+        return 1.0, 0.0
+    # tables are built in padded sizes so nearby stat tuples share one solve
+    win, turns = outcome_table(
+        _round_up(player_health), player_attack, _round_up(enemy_health), enemy_attack,
+    )
+    return min(float(win[player_health, enemy_health]), 1.0), float(turns[player_health, enemy_health])
+
+
+def win_chances(player_health, player_attack, enemy_health, enemy_attack):
+    # battle_outcome's win chance for arrays of enemy stats, with one table
+    # per distinct enemy attack instead of one lookup per enemy
+    chances = np.zeros(len(enemy_health))
+    if player_health <= 0:
+        return chances
+    for attack in np.unique(enemy_attack).tolist():
+        picked = enemy_attack == attack
+        health = np.maximum(enemy_health[picked], 0)
+        win, _ = outcome_table(
+            _round_up(player_health), player_attack, _round_up(max(int(health.max()), 1)), attack,
+        )
+        chances[picked] = np.where(health > 0, np.minimum(win[player_health, health], 1.0), 1.0)
+    return chances
+
+
+def win_probability(player, enemy):
+    return battle_outcome(player.health, player.attack_power, enemy.health, enemy.attack_power)[0]
+
+
+def expected_turns(player, enemy):
+    return battle_outcome(player.health, player.attack_power, enemy.health, enemy.attack_power)[1]
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from game import Player, Enemy, GameWorld
+from simulation import simulate_battles, scalar_battles
+
+# Balance sweeps over (player level, attack_power, enemy) grids. Every config
+# gets its own RNG stream derived from the base seed and the config itself, so
+# results do not depend on worker count or scheduling order. Results are
+# appended to a JSON lines file and finished configs are skipped on restart.
+
+
+def default_enemies():
+    roster = GameWorld(Player("Sweep")).enemies
+    return [Enemy(e.name, e.health, e.attack_power, e.experience_value) for e in roster]
+
+
+def make_player(level, attack_power):
+    player = Player("Sweep")
+    player.level = level
+    player.health = 100 + 20 * (level - 1)
+    player.attack_power = attack_power
+    return player
+
+
+def build_grid(levels, attack_powers, enemies):
+    grid = []
+    for level in levels:
+        for attack_power in attack_powers:
+            for index, enemy in enumerate(enemies):
+                grid.append({
+                    "level": level,
+                    "attack_power": attack_power,
+                    "enemy_index": index,
+                    "enemy": enemy.name,
+                    "enemy_health": enemy.health,
+                    "enemy_attack_power": enemy.attack_power,
+                    "enemy_experience": enemy.experience_value,
+                })
+    return grid
+
+
+def config_key(config, battles, seed, engine):
+    # a row only counts as done for the same battle count, seed and engine
+    return f"{config['level']}:{config['attack_power']}:{config['enemy_index']}:{config['enemy']}:{battles}:{seed}:{engine}"
+
+
+def result_key(result):
+    return config_key(result, result.get("battles"), result.get("seed"), result.get("engine"))
+
+
+def config_seed(seed, config):
+    entropy = [seed, config["level"], config["attack_power"], config["enemy_index"]]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+def run_config(config, battles, seed, engine):
+    player = make_player(config["level"], config["attack_power"])
+    enemy = Enemy(config["enemy"], config["enemy_health"], config["enemy_attack_power"], config["enemy_experience"])
+    if engine == "scalar":
+        stats = scalar_battles(player, enemy, battles, seed=config_seed(seed, config))
+    else:
+        stats = simulate_battles(player, enemy, battles, seed=config_seed(seed, config))
+    result = dict(config, battles=battles, seed=seed, engine=engine)
+    result.update(stats.summary())
+    result["turn_distribution"] = stats.turn_distribution().tolist()
+    return result
+
+
+def load_results(path):
+    # Reads finished configs and drops a partially written last line
+    done = {}
+    if not os.path.exists(path):
+        return done
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                result = json.loads(line)
+            except ValueError:
+                break
+            done[result_key(result)] = result
+            valid_bytes += len(line)
+    if valid_bytes != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def run_sweep(grid, out_path, battles=100_000, seed=0, workers=None, engine="numpy"):
+    done = load_results(out_path)
+    keys = [config_key(config, battles, seed, engine) for config in grid]
+    pending = [config for config, key in zip(grid, keys) if key not in done]
+    workers = workers or os.cpu_count() or 1
+    with open(out_path, "a") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        queued = iter(pending)
+        running = set()
+        while True:
+            # keep a bounded number of configs in flight so huge grids stay cheap
+            while len(running) < workers * 2:
+                config = next(queued, None)
+                if config is None:
+                    break
+                running.add(pool.submit(run_config, config, battles, seed, engine))
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                done[result_key(result)] = result
+    return {key: done[key] for key in keys if key in done}
+
+
+def parse_range(text):
+    # "5", "1,2,4" or "1-10" / "10-60:5" (inclusive)
+    values = []
+    for part in text.split(","):
+        step = 1
+        if ":" in part:
+            part, step = part.split(":")
+            step = int(step)
+        if "-" in part:
+            start, stop = part.split("-")
+            values.extend(range(int(start), int(stop) + 1, step))
+        else:
+            values.append(int(part))
+    return values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a balance sweep across all cores.")
+    parser.add_argument("--out", default="sweep_results.jsonl")
+    parser.add_argument("--levels", default="1-10")
+    parser.add_argument("--attack", default="10-60:5")
+    parser.add_argument("--battles", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--engine", choices=["numpy", "scalar"], default="numpy")
+    args = parser.parse_args()
+
+    grid = build_grid(parse_range(args.levels), parse_range(args.attack), default_enemies())
+    results = run_sweep(grid, args.out, args.battles, args.seed, args.workers, args.engine)
+    print(f"{len(results)} of {len(grid)} configs written to {args.out}")
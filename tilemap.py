@@ -0,0 +1,186 @@
+import os
+import struct
+import numpy as np
+
+# Persistent tile world stored in fixed-size chunks in one memory-mapped file.
+#
+# Layout: a header, one "generated" flag per chunk, then the tiles in
+# chunk-major order (chunk row, chunk column, tile row, tile column), so each
+# chunk is one contiguous block on disk. The file is created sparse and a
+# chunk is only generated, from the world seed and its coordinates, the first
+# time it is read. Nothing but the chunks actually touched is ever paged in.
+
+MAGIC = b"RPGM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQq")
+TILES_ALIGN = 4096
+
+CHUNK_SIZE = 64
+NOISE_SCALES = ((48, 0.7), (12, 0.3))
+MAX_SPAWNS = 3
+
+GRASS, SAND, FOREST, WATER, MOUNTAIN = range(5)
+TERRAIN_NAMES = ("grass", "sand", "forest", "water", "mountain")
+TERRAIN_COLORS = ("#6aa84f", "#e6d38a", "#2f6b2f", "#3d85c6", "#7f7f7f")
+TERRAIN_LEVELS = ((0.30, WATER), (0.36, SAND), (0.62, GRASS), (0.78, FOREST), (1.01, MOUNTAIN))
+BLOCKED = (WATER, MOUNTAIN)
+
+ENEMY_SPAWN, ITEM_SPAWN = 0, 1
+
+
+class TileMapError(Exception):
+    pass
+
+
+def lattice_noise(seed, x, y):
+    # splitmix64 of the lattice coordinates, as floats in [0, 1)
+    h = (x.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) ^ (y.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F))
+    h ^= np.uint64(seed % (1 << 64))
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def value_noise(seed, xs, ys, scale):
+    # Smoothly interpolated lattice noise; depends only on world coordinates,
+    # so neighbouring chunks line up without seeing each other
+    fx, fy = xs / scale, ys / scale
+    x0, y0 = np.floor(fx).astype(np.int64), np.floor(fy).astype(np.int64)
+    tx, ty = fx - x0, fy - y0
+    tx, ty = tx * tx * (3 - 2 * tx), ty * ty * (3 - 2 * ty)
+    top = lattice_noise(seed, x0, y0) * (1 - tx) + lattice_noise(seed, x0 + 1, y0) * tx
+    bottom = lattice_noise(seed, x0, y0 + 1) * (1 - tx) + lattice_noise(seed, x0 + 1, y0 + 1) * tx
+    return top * (1 - ty) + bottom * ty
+
+
+class TileMap:
+    def __init__(self, path, width=None, height=None, seed=0, chunk_size=CHUNK_SIZE):
+        # Opens the map at path, creating it when it does not exist yet
+        self.path = path
+        if not os.path.exists(path):
+            if width is None or height is None:
+                raise TileMapError(f"{path} does not exist and no size was given")
+            self.create(path, width, height, seed, chunk_size)
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise TileMapError(f"{path} is too short to be a tile map")
+        magic, version, self.chunk_size, self.width, self.height, self.seed = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise TileMapError(f"{path} is not a tile map")
+        if version != VERSION:
+            raise TileMapError(f"unsupported tile map version {version}")
+        self.chunks_x, self.chunks_y, tiles_offset = self.layout(self.width, self.height, self.chunk_size)
+        self.generated = np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER.size,
+                                   shape=(self.chunks_y, self.chunks_x))
+        self.tiles = np.memmap(path, dtype=np.uint8, mode="r+", offset=tiles_offset,
+                               shape=(self.chunks_y, self.chunks_x, self.chunk_size, self.chunk_size))
+
+    @staticmethod
+    def layout(width, height, chunk_size):
+        chunks_x = -(-width // chunk_size)
+        chunks_y = -(-height // chunk_size)
+        tiles_offset = -(-(HEADER.size + chunks_x * chunks_y) // TILES_ALIGN) * TILES_ALIGN
+        return chunks_x, chunks_y, tiles_offset
+
+    @classmethod
+    def create(cls, path, width, height, seed, chunk_size):
+        chunks_x, chunks_y, tiles_offset = cls.layout(width, height, chunk_size)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, chunk_size, width, height, seed))
+            # truncate leaves a sparse file; untouched chunks take no disk space
+            f.truncate(tiles_offset + chunks_x * chunks_y * chunk_size * chunk_size)
+
+    def flush(self):
+        self.generated.flush()
+        self.tiles.flush()
+
+    def close(self):
+        self.flush()
+        # the memmaps unmap once nothing references them
+        self.generated = self.tiles = None
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def chunk_of(self, x, y):
+        return x // self.chunk_size, y // self.chunk_size
+
+    def chunk(self, cx, cy):
+        if not self.generated[cy, cx]:
+            self.tiles[cy, cx] = self.generate(cx, cy)
+            self.generated[cy, cx] = 1
+        return self.tiles[cy, cx]
+
+    def generate(self, cx, cy):
+        size = self.chunk_size
+        xs = (cx * size + np.arange(size))[np.newaxis, :]
+        ys = (cy * size + np.arange(size))[:, np.newaxis]
+        height = sum(weight * value_noise(self.seed + octave, xs, ys, scale)
+                     for octave, (scale, weight) in enumerate(NOISE_SCALES))
+        terrain = np.full((size, size), MOUNTAIN, dtype=np.uint8)
+        for limit, kind in reversed(TERRAIN_LEVELS):
+            terrain[height < limit] = kind
+        return terrain
+
+    def tile(self, x, y):
+        cx, cy = self.chunk_of(x, y)
+        return int(self.chunk(cx, cy)[y % self.chunk_size, x % self.chunk_size])
+
+    def passable(self, x, y):
+        return self.in_bounds(x, y) and self.tile(x, y) not in BLOCKED
+
+    def chunks_in(self, left, top, width, height):
+        # chunk coordinates overlapping a tile rectangle, clipped to the map
+        right, bottom = min(left + width, self.width), min(top + height, self.height)
+        left, top = max(left, 0), max(top, 0)
+        if right <= left or bottom <= top:
+            return []
+        return [(cx, cy)
+                for cy in range(top // self.chunk_size, (bottom - 1) // self.chunk_size + 1)
+                for cx in range(left // self.chunk_size, (right - 1) // self.chunk_size + 1)]
+
+    def window(self, left, top, width, height):
+        # Copies the visible tiles into a small array, generating only the
+        # chunks it overlaps; tiles outside the map read as water
+        view = np.full((height, width), WATER, dtype=np.uint8)
+        size = self.chunk_size
+        for cx, cy in self.chunks_in(left, top, width, height):
+            x0, y0 = max(left, cx * size), max(top, cy * size)
+            x1 = min(left + width, (cx + 1) * size, self.width)
+            y1 = min(top + height, (cy + 1) * size, self.height)
+            view[y0 - top:y1 - top, x0 - left:x1 - left] = \
+                self.chunk(cx, cy)[y0 - cy * size:y1 - cy * size, x0 - cx * size:x1 - cx * size]
+        return view
+
+    def nearest_open(self, x, y, radius=None):
+        radius = radius or self.chunk_size
+        view = self.window(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1)
+        open_tiles = np.argwhere(~np.isin(view, BLOCKED))
+        if not len(open_tiles):
+            raise TileMapError(f"no open tile within {radius} of ({x}, {y})")
+        distance = np.abs(open_tiles - radius).sum(axis=1)
+        row, column = open_tiles[int(np.argmin(distance))]
+        return x - radius + int(column), y - radius + int(row)
+
+    def spawns(self, cx, cy, enemy_kinds, item_kinds):
+        # Deterministic spawn points for a chunk: (x, y, ENEMY_SPAWN or
+        # ITEM_SPAWN, index into the caller's roster), on open tiles only
+        rng = np.random.default_rng([self.seed % (1 << 63), cx, cy])
+        terrain = self.chunk(cx, cy)
+        count = int(rng.integers(0, MAX_SPAWNS + 1))
+        rows = rng.integers(0, self.chunk_size, count)
+        columns = rng.integers(0, self.chunk_size, count)
+        kinds = rng.integers(0, 2, count)
+        picks = rng.random(count)
+        spawns = []
+        for row, column, kind, pick in zip(rows.tolist(), columns.tolist(), kinds.tolist(), picks.tolist()):
+            x, y = cx * self.chunk_size + column, cy * self.chunk_size + row
+            if terrain[row, column] in BLOCKED or not self.in_bounds(x, y):
+                continue
+            roster = enemy_kinds if kind == ENEMY_SPAWN else item_kinds
+            spawns.append((x, y, kind, int(pick * roster)))
+        return spawns